@@ -0,0 +1,418 @@
+import numpy as np
+from DeckBattleGym.envs.card import AttackEffect, XAttackEffect, BlockEffect, BlockBasedAttack, BuffEffect, DebuffEffect, DrawEffect, EnergyEffect, HPEffect, DoubleBlockEffect, DoubleStrengthEffect
+from DeckBattleGym.envs.enemy import AttackIntent, BlockIntent, BuffIntent, DebuffIntent, InsertCardIntent
+from DeckBattleGym.envs.loader import get_registry
+
+
+# Plays N battles of one deck against one enemy group in lockstep, as a struct of arrays.
+# Mirrors Battle.run with RandomStrategy for the subset of content below; anything else
+# is reported by unsupported_reason() so callers can fall back to the reference engine.
+
+
+class UnsupportedContent(Exception):
+    # raised while compiling a deck or enemy group the batch engine cannot play; the message says why
+    pass
+
+
+_TARGET_KINDS = {"single_enemy": "single", "random_enemy": "single", "lowest_hp": "lowest", "all_enemies": "all", "self": "self"}
+_STAT_BUFFS = ("Strength", "Dexterity")
+# debuffs that do something outside EffectCalculator
+_SPECIAL_DEBUFFS = ("NoDraw", "LoseStrength", "Poison")
+# effects that act on the user once per target
+_USER_OPS = ("block", "energy", "hp", "double_block", "double_strength")
+
+
+def _compile_card(card):
+    if card.name == "Burn" or card.retain or card.shuffle_back:
+        raise UnsupportedContent(f"card '{card.name}' needs pile handling the batch engine lacks")
+    target = _TARGET_KINDS.get(card.target_selector)
+    if target is None:
+        raise UnsupportedContent(f"card '{card.name}' has target_selector '{card.target_selector}'")
+
+    ops = []
+    for effect in card.effects:
+        kind = type(effect)
+        if kind is AttackEffect:
+            ops.append(("attack", effect.amount))
+        elif kind is XAttackEffect:
+            ops.append(("x_attack", effect.damage_per_hit))
+        elif kind is BlockBasedAttack:
+            ops.append(("block_attack", None))
+        elif kind is BlockEffect:
+            ops.append(("block", effect.amount))
+        elif kind is BuffEffect and effect.name in _STAT_BUFFS and effect.duration is None and target == "self":
+            ops.append(("buff", (effect.name, effect.value)))
+        elif kind is DebuffEffect and effect.name not in _SPECIAL_DEBUFFS:
+            ops.append(("debuff", (effect.name, effect.duration)))
+        elif kind is DrawEffect:
+            ops.append(("draw", effect.amount))
+        elif kind is EnergyEffect:
+            ops.append(("energy", effect.amount))
+        elif kind is HPEffect:
+            ops.append(("hp", effect.amount))
+        elif kind is DoubleBlockEffect:
+            ops.append(("double_block", None))
+        elif kind is DoubleStrengthEffect:
+            ops.append(("double_strength", None))
+        else:
+            raise UnsupportedContent(f"card '{card.name}' uses {kind.__name__}")
+
+        if ops[-1][0] in ("attack", "x_attack", "block_attack") and target == "self":
+            raise UnsupportedContent(f"card '{card.name}' attacks its user")
+        if ops[-1][0] in _USER_OPS and target == "all":
+            raise UnsupportedContent(f"card '{card.name}' repeats a self effect per enemy")
+
+    return {
+        "id": card.id,
+        "cost": 0 if card.cost == "x" else card.cost,
+        "is_x": card.cost == "x",
+        "playable": card.playable,
+        "target": target,
+        "removed": card.exhaust or card.card_type == "power",
+        "ethereal": card.ethereal,
+        "ops": ops
+    }
+
+
+class BatchBattle:
+    def __init__(self, deck, enemies, num_battles,
+                 registry=None,
+                 seed=None,
+                 player_hp=80,
+                 max_energy=3,
+                 draw_per_turn=5,
+                 hand_limit=10,
+                 max_turns=1000):
+        self.registry = registry or get_registry()
+        self.num_battles = num_battles
+        self.max_energy = max_energy
+        self.draw_per_turn = draw_per_turn
+        self.hand_limit = hand_limit
+        self.max_turns = max_turns
+        self.rng = np.random.default_rng(seed)
+
+        self.cards = []
+        self._card_types = {}
+        deck_types = np.array([self._card_type(card) for card in deck], dtype=np.int64)
+        self.enemies = [self._compile_enemy(enemy) for enemy in enemies]
+        self._build_card_table()
+
+        n, e, d = num_battles, len(enemies), len(deck)
+        self.p_hp = np.full(n, player_hp, dtype=np.int64)
+        self.p_max_hp = player_hp
+        self.p_block = np.zeros(n, dtype=np.int64)
+        self.p_energy = np.zeros(n, dtype=np.int64)
+        self.p_buffs = {name: np.zeros(n, dtype=np.int64) for name in _STAT_BUFFS}
+        self.p_debuffs = {name: np.zeros(n, dtype=np.int64) for name in self._debuff_names(player=True)}
+
+        self.e_hp = np.array([[enemy.hp for enemy in enemies]] * n, dtype=np.int64).reshape(n, e)
+        self.e_block = np.array([[enemy.block for enemy in enemies]] * n, dtype=np.int64).reshape(n, e)
+        self.e_buffs = {
+            name: np.array([[enemy.buffs.get(name, {}).get("value", 0) for enemy in enemies]] * n, dtype=np.int64).reshape(n, e)
+            for name in _STAT_BUFFS
+        }
+        self.e_debuffs = {name: np.zeros((n, e), dtype=np.int64) for name in self._debuff_names(player=False)}
+
+        capacity = d + 16
+        self.draw_pile = np.zeros((n, capacity), dtype=np.int64)
+        self.draw_len = np.full(n, d, dtype=np.int64)
+        self.discard_pile = np.zeros((n, capacity), dtype=np.int64)
+        self.discard_len = np.zeros(n, dtype=np.int64)
+        self.hand = np.zeros((n, hand_limit), dtype=np.int64)
+        self.hand_len = np.zeros(n, dtype=np.int64)
+        if d:
+            self.draw_pile[:, :d] = deck_types[np.argsort(self.rng.random((n, d)), axis=1)]
+
+        self.turns_taken = np.zeros(n, dtype=np.int64)
+        self.victory = np.zeros(n, dtype=bool)
+
+    def _card_type(self, card):
+        index = self._card_types.get(card.id)
+        if index is None:
+            index = self._card_types[card.id] = len(self.cards)
+            self.cards.append(_compile_card(card))
+        return index
+
+    def _compile_enemy(self, enemy):
+        for name, entry in enemy.buffs.items():
+            if name not in _STAT_BUFFS or "duration" in entry:
+                raise UnsupportedContent(f"enemy '{enemy.name}' starts with buff '{name}'")
+        if enemy.debuffs:
+            raise UnsupportedContent(f"enemy '{enemy.name}' starts with debuffs")
+
+        turns = []
+        for turn_intents in enemy.intent_sq or ():
+            ops = []
+            for intent in turn_intents:
+                kind = type(intent)
+                if kind is AttackIntent:
+                    ops.append(("attack", intent.amount))
+                elif kind is BlockIntent and intent.target_selector == "self":
+                    ops.append(("block", intent.amount))
+                elif kind is BuffIntent and intent.target_selector == "self" and intent.name in _STAT_BUFFS and intent.duration is None:
+                    ops.append(("buff", (intent.name, intent.value)))
+                elif kind is DebuffIntent and intent.name not in _SPECIAL_DEBUFFS:
+                    ops.append(("debuff", (intent.name, intent.duration)))
+                elif kind is InsertCardIntent and intent.destination == "discard":
+                    ops.append(("insert", (self._card_type(self.registry.card(intent.card_id)), intent.amount)))
+                else:
+                    raise UnsupportedContent(f"enemy '{enemy.name}' uses {kind.__name__}")
+            turns.append(ops)
+        return {"name": enemy.name, "turns": turns, "die_after_turn": enemy.die_after_turn}
+
+    def _debuff_names(self, player):
+        names = set()
+        for card in self.cards:
+            for op, arg in card["ops"]:
+                if op == "debuff" and (card["target"] == "self") == player:
+                    names.add(arg[0])
+        if player:
+            for enemy in self.enemies:
+                for ops in enemy["turns"]:
+                    names.update(arg[0] for op, arg in ops if op == "debuff")
+        return sorted(names)
+
+    def _build_card_table(self):
+        self.c_cost = np.array([c["cost"] for c in self.cards], dtype=np.int64)
+        self.c_is_x = np.array([c["is_x"] for c in self.cards], dtype=bool)
+        self.c_playable = np.array([c["playable"] for c in self.cards], dtype=bool)
+        self.c_needs_enemy = np.array([c["target"] != "self" for c in self.cards], dtype=bool)
+        self.c_ethereal = np.array([c["ethereal"] for c in self.cards], dtype=bool)
+
+    # ----- piles -----
+
+    def _ensure_capacity(self, rows, extra):
+        owned = self.draw_len[rows] + self.discard_len[rows] + self.hand_len[rows]
+        needed = int(owned.max()) + extra if rows.size else 0
+        capacity = self.draw_pile.shape[1]
+        if needed > capacity:
+            grow = max(needed, 2 * capacity) - capacity
+            pad = np.zeros((self.num_battles, grow), dtype=np.int64)
+            self.draw_pile = np.concatenate([self.draw_pile, pad], axis=1)
+            self.discard_pile = np.concatenate([self.discard_pile, pad], axis=1)
+
+    def _add_to_discard(self, rows, card_type, amount=1):
+        self._ensure_capacity(rows, amount)
+        for _ in range(amount):
+            self.discard_pile[rows, self.discard_len[rows]] = card_type
+            self.discard_len[rows] += 1
+
+    def _reshuffle(self, rows):
+        counts = self.discard_len[rows]
+        keys = self.rng.random((rows.size, self.discard_pile.shape[1]))
+        keys[np.arange(keys.shape[1])[None, :] >= counts[:, None]] = 2.0
+        order = np.argsort(keys, axis=1)
+        self.draw_pile[rows] = np.take_along_axis(self.discard_pile[rows], order, axis=1)
+        self.draw_len[rows] = counts
+        self.discard_len[rows] = 0
+
+    def _draw(self, rows, num):
+        for _ in range(num):
+            rows = rows[self.hand_len[rows] < self.hand_limit]
+            empty = rows[(self.draw_len[rows] == 0) & (self.discard_len[rows] > 0)]
+            if empty.size:
+                self._reshuffle(empty)
+            rows = rows[self.draw_len[rows] > 0]
+            if not rows.size:
+                return
+            self.draw_len[rows] -= 1
+            self.hand[rows, self.hand_len[rows]] = self.draw_pile[rows, self.draw_len[rows]]
+            self.hand_len[rows] += 1
+
+    # ----- damage -----
+
+    def _status(self, table, name, index):
+        values = table.get(name)
+        return None if values is None else values[index] > 0
+
+    @staticmethod
+    def _scale(damage, mask, factor):
+        if mask is None:
+            return damage
+        return np.where(mask, np.trunc(damage * factor), damage)
+
+    def _player_attack(self, rows, base):
+        damage = base + self.p_buffs["Strength"][rows]
+        return self._scale(damage.astype(np.float64), self._status(self.p_debuffs, "Weak", rows), 0.75)
+
+    def _hit_enemies(self, rows, cols, damage, hits=1):
+        damage = self._scale(damage, self._status(self.e_debuffs, "Vulnerable", (rows, cols)), 1.5)
+        # repeated equal hits against block lose the same hp as one hit of their sum
+        damage = np.maximum(0, damage).astype(np.int64) * hits
+        block = self.e_block[rows, cols]
+        self.e_hp[rows, cols] -= np.maximum(0, damage - block)
+        self.e_block[rows, cols] = np.maximum(0, block - damage)
+
+    def _hit_player(self, rows, damage):
+        damage = self._scale(damage, self._status(self.p_debuffs, "Vulnerable", rows), 1.5)
+        damage = np.maximum(0, damage).astype(np.int64)
+        block = self.p_block[rows]
+        self.p_hp[rows] -= np.maximum(0, damage - block)
+        self.p_block[rows] = np.maximum(0, block - damage)
+
+    # ----- player turn -----
+
+    def _apply_card(self, card, rows, target, alive):
+        kind = card["target"]
+        if kind == "all":
+            hit_rows, hit_cols = np.nonzero(alive)
+            hit_rows_global = rows[hit_rows]
+        else:
+            hit_rows, hit_cols, hit_rows_global = np.arange(rows.size), target, rows
+
+        for op, arg in card["ops"]:
+            if op in ("attack", "x_attack", "block_attack"):
+                if op == "block_attack":
+                    base = self.p_block[rows]
+                else:
+                    base = np.full(rows.size, arg, dtype=np.int64)
+                damage = self._player_attack(rows, base)
+                hits = self.p_energy[hit_rows_global] if op == "x_attack" else 1
+                self._hit_enemies(hit_rows_global, hit_cols, damage[hit_rows], hits)
+            elif op == "block":
+                block = self._scale(np.full(rows.size, float(arg)), self._status(self.p_debuffs, "Frail", rows), 0.75)
+                self.p_block[rows] += np.maximum(0, block.astype(np.int64) + self.p_buffs["Dexterity"][rows])
+            elif op == "buff":
+                self.p_buffs[arg[0]][rows] += arg[1]
+            elif op == "debuff":
+                name, duration = arg
+                if kind == "self":
+                    self.p_debuffs[name][rows] += duration
+                else:
+                    self.e_debuffs[name][hit_rows_global, hit_cols] += duration
+            elif op == "draw":
+                self._draw(rows, arg)
+            elif op == "energy":
+                self.p_energy[rows] += arg
+            elif op == "hp":
+                self.p_hp[rows] = np.minimum(self.p_hp[rows] + arg, self.p_max_hp)
+            elif op == "double_block":
+                self.p_block[rows] *= 2
+            elif op == "double_strength":
+                strength = self.p_buffs["Strength"]
+                strength[rows] = np.where(strength[rows] > 0, strength[rows] * 2, strength[rows])
+
+    def _play_cards(self, rows):
+        slots = np.arange(self.hand_limit)
+        while rows.size:
+            hand = self.hand[rows]
+            playable = (slots[None, :] < self.hand_len[rows][:, None]) & self.c_playable[hand] & \
+                (self.c_is_x[hand] | (self.c_cost[hand] <= self.p_energy[rows][:, None]))
+            has_card = playable.any(axis=1)
+            rows, playable = rows[has_card], playable[has_card]
+            if not rows.size:
+                return
+
+            keys = self.rng.random(playable.shape)
+            keys[~playable] = -1.0
+            slot = keys.argmax(axis=1)
+            card_types = self.hand[rows, slot]
+
+            # like RandomStrategy, picking an attack with nobody left alive ends the turn
+            alive = self.e_hp[rows] > 0
+            go_on = ~self.c_needs_enemy[card_types] | alive.any(axis=1)
+            rows, slot, card_types, alive = rows[go_on], slot[go_on], card_types[go_on], alive[go_on]
+            if not rows.size:
+                return
+
+            last = self.hand_len[rows] - 1
+            self.hand[rows, slot] = self.hand[rows, last]
+            self.hand_len[rows] = last
+
+            keys = self.rng.random(alive.shape)
+            keys[~alive] = -1.0
+            random_target = keys.argmax(axis=1)
+            lowest_target = np.where(alive, self.e_hp[rows], np.iinfo(np.int64).max).argmin(axis=1)
+
+            for card_type in np.unique(card_types):
+                card = self.cards[card_type]
+                picked = card_types == card_type
+                played = rows[picked]
+                target = lowest_target[picked] if card["target"] == "lowest" else random_target[picked]
+                self._apply_card(card, played, target, alive[picked])
+
+                if card["is_x"]:
+                    self.p_energy[played] = 0
+                else:
+                    self.p_energy[played] -= card["cost"]
+                if not card["removed"]:
+                    self._add_to_discard(played, card_type)
+
+    def _cleanup(self, rows):
+        hand = self.hand[rows]
+        kept = (np.arange(self.hand_limit)[None, :] < self.hand_len[rows][:, None]) & ~self.c_ethereal[hand]
+        row_index, slot_index = np.nonzero(kept)
+        position = self.discard_len[rows][row_index] + (np.cumsum(kept, axis=1)[row_index, slot_index] - 1)
+        self.discard_pile[rows[row_index], position] = hand[row_index, slot_index]
+        self.discard_len[rows] += kept.sum(axis=1)
+        self.hand_len[rows] = 0
+
+    # ----- enemy turn -----
+
+    def _enemy_turn(self, rows, turn):
+        for index, enemy in enumerate(self.enemies):
+            acting = rows[self.e_hp[rows, index] > 0]
+            if not acting.size:
+                continue
+            if enemy["die_after_turn"] is not None and turn >= enemy["die_after_turn"]:
+                self.e_hp[acting, index] = 0
+                continue
+            self.e_block[acting, index] = 0
+            for durations in self.e_debuffs.values():
+                durations[acting, index] = np.maximum(durations[acting, index] - 1, 0)
+            if not enemy["turns"]:
+                continue
+
+            # every live battle is on the same turn, so each enemy runs the same intents everywhere
+            for op, arg in enemy["turns"][(turn - 1) % len(enemy["turns"])]:
+                if op == "attack":
+                    damage = (arg + self.e_buffs["Strength"][acting, index]).astype(np.float64)
+                    damage = self._scale(damage, self._status(self.e_debuffs, "Weak", (acting, index)), 0.75)
+                    self._hit_player(acting, damage)
+                elif op == "block":
+                    block = self._scale(np.full(acting.size, float(arg)), self._status(self.e_debuffs, "Frail", (acting, index)), 0.75)
+                    self.e_block[acting, index] += np.maximum(0, block.astype(np.int64) + self.e_buffs["Dexterity"][acting, index])
+                elif op == "buff":
+                    self.e_buffs[arg[0]][acting, index] += arg[1]
+                elif op == "debuff":
+                    self.p_debuffs[arg[0]][acting] += arg[1]
+                elif op == "insert":
+                    self._add_to_discard(acting, arg[0], arg[1])
+
+    def _finish(self, rows):
+        victory = (self.e_hp[rows] <= 0).all(axis=1)
+        self.victory[rows[victory]] = True
+        return rows[~victory & (self.p_hp[rows] > 0)]
+
+    def run(self):
+        rows = np.arange(self.num_battles)
+        turn = 0
+        while rows.size and turn < self.max_turns:
+            turn += 1
+            self.turns_taken[rows] = turn
+            self.p_block[rows] = 0
+            self.p_energy[rows] = self.max_energy
+            for durations in self.p_debuffs.values():
+                durations[rows] = np.maximum(durations[rows] - 1, 0)
+            self._draw(rows, self.draw_per_turn)
+            self._play_cards(rows)
+            rows = self._finish(rows)
+            if not rows.size:
+                break
+            self._cleanup(rows)
+            self._enemy_turn(rows, turn)
+            rows = self._finish(rows)
+
+        return {
+            "final_hp": self.p_hp,
+            "turns_taken": self.turns_taken,
+            "win": self.victory & (self.p_hp > 0)
+        }
+
+
+def unsupported_reason(deck, enemies, registry=None):
+    try:
+        BatchBattle(deck, enemies, 0, registry=registry)
+    except UnsupportedContent as e:
+        return str(e)
+    return None
@@ -1,5 +1,23 @@
-import os
+import copy
 import random
+from itertools import count
+from time import perf_counter
+from DeckBattleGym.envs.loader import get_registry
+from DeckBattleGym.envs.log_sink import NullLogSink, shared_file_sink
+from DeckBattleGym.envs.battle_log import (BattleLog, state_snapshot, TURN, PLAYER_TURN, NO_DRAW, HAND_LIMIT, DRAW,
+                                           HAND_CARDS, HAND, PLAY, END_HAND, TURN_END, ENEMY_TURN, AUTO_DEATH,
+                                           RESULT, FINISH)
+
+
+_battle_ids = count(1)
+
+# bump whenever a change here or in the cards, enemies, powers or strategies changes battle outcomes
+# for the same data and seed; cached results (see sim/sweep.py) keyed on it are then recomputed
+ENGINE_VERSION = 1
+
+# pile names are the Battle attributes holding them
+DRAW_PILE, HAND_PILE, DISCARD_PILE, EXHAUST_PILE, POWER_PILE = "deck", "hand", "discard_pile", "exhaust_pile", "used_powers"
+PILES = (DRAW_PILE, HAND_PILE, DISCARD_PILE, EXHAUST_PILE, POWER_PILE)
 
 
 class VictoryCondition:
@@ -15,15 +33,25 @@ class Battle:
                 draw_per_turn:int=5, hand_limit:int=10,
                 card_pool=None,
                 victory_condition=None, 
-                if_battle_log=False):
+                if_battle_log=False,
+                registry=None,
+                log_sink=None,
+                rng=None,
+                seed=None,
+                profiler=None):
         self.player = player
         self.enemies = enemies
         self.deck = deck
-        self.original_deck = deck
+        self.original_deck = list(deck)
+        self.original_enemies = list(enemies)
         self.draw_per_turn = draw_per_turn
         self.hand_limit = hand_limit
         self.card_pool = card_pool or {}
-        self.card_id_map = {c["id"]: c for c in card_pool}
+        # pre-parsed card and enemy templates for mid-battle spawns, so run() never touches the data files
+        self.registry = registry or get_registry()
+        self.rng = rng if rng is not None else random.Random()
+        if seed is not None:
+            self.seed(seed)
         self.victory_condition = victory_condition or VictoryCondition()
         self.if_battle_log= if_battle_log
         self.hand = []
@@ -32,82 +60,191 @@ class Battle:
         self.exhaust_pile = []
         self.used_powers = []
         self.turn = 0
-        self.log = []
-        self.simulation_log={
-            "turns":[]
-        }
-        self.running_log = None
-        self.battle_count = self._get_battle_count()
+        # structured events; the text log, simulation_log and replay are all read from it
+        self.log = BattleLog()
+        self.battle_id = next(_battle_ids)
+        # file names are only picked by the sink when a text log is actually written; the default file
+        # sink is shared by every Battle in the process, so the log directory is listed once
+        if log_sink is None:
+            log_sink = shared_file_sink() if if_battle_log else NullLogSink()
+        self.log_sink = log_sink
+        # BattleProfiler or None; when None run() takes the untimed path
+        self.profiler = profiler
+        # told about every card entering or leaving a pile (see move_card), e.g. an ObservationEncoder
+        self.pile_listener = None
     
-    def _get_battle_count(self):
-        counter = 1
-        while os.path.exists(f"battle_log_{counter}.txt"):
-            counter += 1
-        return counter
+    def seed(self, seed):
+        # seeds the shuffles and the player's strategy from one number
+        self.rng.seed(seed)
+        # the strategy gets its own stream, so its choices never shift the shuffles
+        strategy_rng = getattr(self.player.strategy, "rng", None)
+        if strategy_rng is not None:
+            strategy_rng.seed(self.rng.getrandbits(64))
+
+    def reset(self, seed=None):
+        # cards, effects and intent sequences are shared across runs, only mutable state is rebuilt
+        if seed is not None:
+            self.seed(seed)
+        self.player.reset()
+        for enemy in self.original_enemies:
+            enemy.reset()
+        self.enemies = list(self.original_enemies)
+        self.deck = list(self.original_deck)
+        self.hand = []
+        self.picked_card = []
+        self.discard_pile = []
+        self.exhaust_pile = []
+        self.used_powers = []
+        self.turn = 0
+        self.log = BattleLog()
+        self.battle_id = next(_battle_ids)
+        if self.pile_listener is not None:
+            self.pile_listener.piles_reset(self)
+
+    def move_card(self, card, src=None, dst=None, index=None):
+        # every pile change outside Battle's own loop goes through here. src/dst are pile names, None
+        # for a card created or leaving play; index is the position in dst, default the end
+        if src is not None:
+            getattr(self, src).remove(card)
+        if dst is not None:
+            pile = getattr(self, dst)
+            if index is None:
+                pile.append(card)
+            else:
+                pile.insert(index, card)
+        if self.pile_listener is not None:
+            self.pile_listener.card_moved(card, src, dst)
+
+    def snapshot(self):
+        # the battle's mutable state for lookahead: piles, player and enemy state, intent positions, both
+        # rng streams, turn and log length. Cards, intents and effects never change during a battle and
+        # are shared by reference, so a snapshot costs a few tuple and dict copies
+        strategy_rng = getattr(self.player.strategy, "rng", None)
+        enemies = tuple(self.enemies)
+        return (self.turn, tuple(self.deck), tuple(self.hand), tuple(self.discard_pile), tuple(self.exhaust_pile),
+                tuple(self.used_powers), len(self.picked_card), len(self.log), self.player.snapshot(),
+                enemies, tuple(enemy.snapshot() for enemy in enemies),
+                self.rng.getstate(), None if strategy_rng is None else strategy_rng.getstate())
+
+    def restore(self, snap):
+        # back to a snapshot of this battle; the log and picked_card are cut back to their length then
+        # (enemies spawned since are dropped)
+        (self.turn, deck, hand, discard_pile, exhaust_pile, used_powers, num_picked, log_length, player_state,
+         enemies, enemy_states, rng_state, strategy_rng_state) = snap
+        self.deck = list(deck)
+        self.hand = list(hand)
+        self.discard_pile = list(discard_pile)
+        self.exhaust_pile = list(exhaust_pile)
+        self.used_powers = list(used_powers)
+        del self.picked_card[num_picked:]
+        del self.log[log_length:]
+        self.player.restore(player_state)
+        self.enemies = list(enemies)
+        for enemy, state in zip(enemies, enemy_states):
+            enemy.restore(state)
+        self.rng.setstate(rng_state)
+        if strategy_rng_state is not None:
+            self.player.strategy.rng.setstate(strategy_rng_state)
+        if self.pile_listener is not None:
+            self.pile_listener.piles_reset(self)
+
+    def fork(self):
+        # an independent Battle at the current state, sharing cards, intents and the registry. It has no
+        # pile_listener or profiler; its reset() goes back to the same starting state as this one
+        clone = copy.copy(self)
+        clone.player = self.player.fork()
+        enemies = {id(enemy): enemy.fork() for enemy in self.enemies}
+        for enemy in self.original_enemies:
+            if id(enemy) not in enemies:
+                enemies[id(enemy)] = enemy.fork()
+        clone.enemies = [enemies[id(enemy)] for enemy in self.enemies]
+        clone.original_enemies = [enemies[id(enemy)] for enemy in self.original_enemies]
+        clone.deck = list(self.deck)
+        clone.hand = list(self.hand)
+        clone.picked_card = list(self.picked_card)
+        clone.discard_pile = list(self.discard_pile)
+        clone.exhaust_pile = list(self.exhaust_pile)
+        clone.used_powers = list(self.used_powers)
+        clone.log = BattleLog(self.log)
+        clone.rng = random.Random()
+        clone.rng.setstate(self.rng.getstate())
+        clone.battle_id = next(_battle_ids)
+        clone.pile_listener = None
+        clone.profiler = None
+        return clone
+
+    @property
+    def simulation_log(self):
+        return self.log.simulation_log()
+
+    def replay(self):
+        return self.log.replay()
 
     def log_state(self):
-        enemy_states = [f"{enemy.name}(HP: {enemy.hp}, Block:{enemy.block}, Buffs: {enemy.buffs}, Debuffs: {enemy.debuffs})" for enemy in self.enemies]
-        self.log.append(f"[Turn {self.turn} End] Player HP: {self.player.hp}, Block: {self.player.block}, Buffs: {self.player.buffs}, Debuffs: {self.player.debuffs}, Powers: {self.player.powers}")
-        for e_state in enemy_states:
-            self.log.append(f"Enemy: {e_state}")
+        self.log.append(state_snapshot(self.turn, self.player, self.enemies))
     
     def battle_start(self):
-        random.shuffle(self.deck)
+        self.rng.shuffle(self.deck)
 
     def draw_cards(self, num, hand_limit=10):
+        profiler = self.profiler
+        if profiler is not None:
+            start = perf_counter()
         drawn = 0
         drawn_cards = []
+        listener = self.pile_listener
         if "NoDraw" in self.player.debuffs:
             if self.if_battle_log:
-                self.log.append("Prevented from drawing cards this turn.")
+                self.log.append((NO_DRAW,))
+            if profiler is not None:
+                profiler.add_phase("draw_cards", perf_counter() - start)
             return
         else:
             for _ in range(num):
                 if len(self.hand) >= hand_limit:
                     if self.if_battle_log:
-                        self.log.append("[Draw] Hand limit reached. Cannot draw more cards.")
+                        self.log.append((HAND_LIMIT,))
                     break
 
                 if not self.deck and self.discard_pile:
                     self.deck = self.discard_pile[:]
-                    random.shuffle(self.deck)
+                    self.rng.shuffle(self.deck)
                     self.discard_pile.clear()
+                    if listener is not None:
+                        listener.pile_moved(DISCARD_PILE, DRAW_PILE)
             
                 if self.deck:
                     card = self.deck.pop()
                     self.hand.append(card)
-                    drawn_cards.append(card.name)
+                    if listener is not None:
+                        listener.card_moved(card, DRAW_PILE, HAND_PILE)
+                    drawn_cards.append(card)
                     drawn += 1
                     self.player.after_draw_card(card, battle=self)
                 else:
                     break
 
         if self.if_battle_log:
-            self.log.append(f"[Turn {self.turn}] Drew cards: {', '.join(drawn_cards)}")
-            card_names = [card.name for card in self.hand]
-            self.log.append(f"[Turn {self.turn}] Hand cards: {', '.join(card_names)}")
+            self.log.append((DRAW, self.turn, tuple(drawn_cards)))
+            self.log.append((HAND_CARDS, self.turn, tuple(self.hand)))
+        if profiler is not None:
+            profiler.add_phase("draw_cards", perf_counter() - start)
         return drawn
     
     def play_card(self, card, user, targets=None):
+        profiler = self.profiler
+        if profiler is not None:
+            start = perf_counter()
         if not isinstance(targets, list):
             targets = [targets]
-        if self.if_battle_log:
-            if targets:
-                target_names = ", ".join(t.name for t in targets)
-                target_info = f"targeting {target_names}"
-            else:
-                target_info = "with no target"
-            self.log.append(f"[Play] {user.name} plays {card.name} {target_info}.")
-        else:
-            target_ids = [getattr(t, "id", "unknown") for t in targets]   
-            self.running_log["actions"].append({
-                "card":card.id,
-                "targets":target_ids
-            })
+        self.log.append((PLAY, user.name, card, tuple(targets)))
         #print(f"DEBUG: battle play card target {[t.name for t in targets]}")
         self.picked_card.append(card)
+        listener = self.pile_listener
         if card in self.hand:
             self.hand.remove(card)
+            if listener is not None:
+                listener.card_moved(card, HAND_PILE, None)
         card.apply(user, targets, battle=self)
         if card.cost =="x":
             actual_cost=user.energy
@@ -117,48 +254,57 @@ class Battle:
 
         if getattr(card, 'exhaust', False):
             self.exhaust_pile.append(card)
-            user.trigger_on_exhaust(self)
-        elif getattr(card, 'shuffle_back', False):
-            index = random.randint(0, len(self.deck))
-            self.deck.insert(index, card)
-        elif card.card_type == "power":
-            self.used_powers.append(card)
+            dst = EXHAUST_PILE
+            if listener is not None:
+                listener.card_moved(card, None, dst)
+            user.trigger_on_exhaust(self, card)
         else:
-            self.discard_pile.append(card)
+            if getattr(card, 'shuffle_back', False):
+                index = self.rng.randint(0, len(self.deck))
+                self.deck.insert(index, card)
+                dst = DRAW_PILE
+            elif card.card_type == "power":
+                self.used_powers.append(card)
+                dst = POWER_PILE
+            else:
+                self.discard_pile.append(card)
+                dst = DISCARD_PILE
+            if listener is not None:
+                listener.card_moved(card, None, dst)
+        if profiler is not None:
+            profiler.add_card(card.id, perf_counter() - start)
 
         #if card in self.hand:
         #    self.hand.remove(card)
 
     def player_turn(self):
+        self.start_player_turn()
+        self.player.play_cards(self.hand, self.enemies, self)
+        self.finish_player_turn()
+
+    # the halves of player_turn around the card plays, so an outside agent can play the cards
+    def start_player_turn(self):
         self.player.begin_turn(self)
         if self.if_battle_log:
-            self.log.append(f"\n[Turn {self.turn}] Player's turn begins.")
-            self.draw_cards(self.draw_per_turn)
-        else:
-            self.draw_cards(self.draw_per_turn)
-            self.running_log = {
-                "turn": self.turn,
-                "hand": [card.id for card in self.hand],
-                "actions":[]
-                }
-        self.player.play_cards(self.hand, self.enemies, self)
+            self.log.append((PLAYER_TURN, self.turn))
+        self.draw_cards(self.draw_per_turn)
+        self.log.append((HAND, self.turn, tuple(self.hand)))
+
+    def finish_player_turn(self):
         self.player.end_turn(self)
         if self.if_battle_log:
-            card_names = [card.name for card in self.hand]
-            self.log.append(f"[EndTurn] Hand cards: {', '.join(card_names)}")
-        if not self.if_battle_log:
-            self.running_log["hp_left"]=self.player.hp
-            self.simulation_log["turns"].append(self.running_log)
+            self.log.append((END_HAND, tuple(self.hand)))
+        self.log.append((TURN_END, self.turn, self.player.hp))
     
     def enemy_turn(self):
         if self.if_battle_log:
-            self.log.append(f"[Turn {self.turn}] Enemies' turn begins.")
+            self.log.append((ENEMY_TURN, self.turn))
         for enemy in self.enemies:
             if enemy.hp > 0:
                 if enemy.die_after_turn is not None and self.turn >= enemy.die_after_turn:
                     enemy.hp = 0
                     if self.if_battle_log:
-                        self.log.append(f"[AutoDeath] {enemy.name} dies automatically after turn {self.turn}.")
+                        self.log.append((AUTO_DEATH, enemy.name, self.turn))
                     continue
                 enemy.begin_turn(self)
                 enemy.perform_action(self)
@@ -174,17 +320,22 @@ class Battle:
                 cards_to_discard.append(card)
             elif getattr(card, 'ethereal', False):
                 cards_to_exhaust.append(card)
-                self.player.trigger_on_exhaust(self)
+                self.player.trigger_on_exhaust(self, card)
             elif not getattr(card, 'retain', False):
                 cards_to_discard.append(card)
 
+        listener = self.pile_listener
         for card in cards_to_discard:
             self.hand.remove(card)
             self.discard_pile.append(card)
+            if listener is not None:
+                listener.card_moved(card, HAND_PILE, DISCARD_PILE)
 
         for card in cards_to_exhaust:
             self.hand.remove(card)
             self.exhaust_pile.append(card)
+            if listener is not None:
+                listener.card_moved(card, HAND_PILE, EXHAUST_PILE)
     
 
     def cleanup_after_battle(self):
@@ -193,51 +344,66 @@ class Battle:
         self.discard_pile.clear()
         self.exhaust_pile.clear()
         self.used_powers.clear()
+        if self.pile_listener is not None:
+            self.pile_listener.piles_reset(self)
 
     def check_victory(self):
         if self.victory_condition.is_victory(self.player, self.enemies, self.turn):
-            if self.if_battle_log:
-                self.log.append("[Battle] You win!")
-            else:
-                self.simulation_log["win"]=True
+            self.log.append((RESULT, True))
             return True
         if self.victory_condition.is_defeat(self.player, self.enemies, self.turn):
-            if self.if_battle_log:
-                self.log.append("[Battle] You lose!")
-            else:
-                self.simulation_log["win"]=False
+            self.log.append((RESULT, False))
             return True
         return False
 
-    def save_log_to_file(self):
-        filename = f"battle_log_{self.battle_count}.txt"
-        with open(filename, "w", encoding="utf-8") as f:
-            for entry in self.log:
-                f.write(entry + "\n")
+    def save_log(self):
+        return self.log_sink.write(self.battle_id, list(self.log.lines()))
 
     def run(self):
-        self.battle_start()
+        # the one battle loop; with a profiler every phase is also timed (see _timed)
+        if self.profiler is not None:
+            self.profiler.battles += 1
+        self._timed("battle_start", self.battle_start)
         while True:
-            self.turn += 1
-            if self.if_battle_log:
-                self.log.append(f"\n--- Turn {self.turn} ---")
-            self.player_turn()
-            if self.check_victory():
-                break
-            self.cleanup()
-            self.enemy_turn()
-            if self.check_victory():
+            self.next_turn()
+            self._timed("player_turn", self.player_turn)
+            if self.resolve_turn():
                 break
-            if self.if_battle_log:
-                self.log_state()
-        self.simulation_log["final_hp"] = self.player.hp
-        self.simulation_log["turns_taken"] = self.turn
+        self._timed("finish", self.finish_battle)
+
+    def _timed(self, phase, step):
+        profiler = self.profiler
+        if profiler is None:
+            return step()
+        start = perf_counter()
+        result = step()
+        profiler.add_phase(phase, perf_counter() - start)
+        return result
+
+    # the parts of run() around the player's turn, shared with step-wise drivers such as BattleEnv
+    def next_turn(self):
+        self.turn += 1
+        if self.if_battle_log:
+            self.log.append((TURN, self.turn))
+
+    def resolve_turn(self):
+        # everything after the player's turn; True once the battle is decided
+        if self._timed("check_victory", self.check_victory):
+            return True
+        self._timed("cleanup", self.cleanup)
+        self._timed("enemy_turn", self.enemy_turn)
+        if self._timed("check_victory", self.check_victory):
+            return True
+        if self.if_battle_log:
+            self._timed("log_state", self.log_state)
+        return False
+
+    def finish_battle(self):
+        # records the result and clears the piles; run() calls it, step-wise drivers call it once decided
+        self.log.append((FINISH, self.player.hp, self.turn))
         self.cleanup_after_battle()
-        
-        if "win" not in self.simulation_log:
-            self.simulation_log["win"] = False
 
         if self.if_battle_log:
-            for entry in self.log:
+            for entry in self.log.lines():
                 print(entry)
-            self.save_log_to_file()
\ No newline at end of file
+            self.save_log()
\ No newline at end of file
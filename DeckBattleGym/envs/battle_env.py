@@ -0,0 +1,167 @@
+import numpy as np
+from DeckBattleGym.envs.battle import Battle
+from DeckBattleGym.envs.player import Player
+from DeckBattleGym.envs.player_strategy import RandomStrategy
+from DeckBattleGym.envs.loader import get_registry
+from DeckBattleGym.envs.observation import ObservationEncoder
+
+
+# Step-by-step control of a Battle for an outside agent (reset/step in the Gym style, without
+# depending on gym). An action is hand slot * max_enemies + enemy slot, plus one last action that
+# ends the turn. The enemy slot only matters for single_enemy cards; other target selectors are
+# resolved like RandomStrategy does and use enemy slot 0. action_mask() marks the legal actions.
+# Unlike Battle.run, which only checks the outcome once the player's turn is over, an episode ends
+# as soon as a card play kills the last enemy or the player.
+
+
+def _playable(card, player):
+    # same rules as Player.play_cards with RandomStrategy.select_card
+    if not getattr(card, "playable", True):
+        return False
+    if card.card_type == "attack" and "Entangled" in player.buffs:
+        return False
+    return card.cost == "x" or (isinstance(card.cost, (int, float)) and card.cost <= player.energy)
+
+
+class BattleEnv:
+    def __init__(self, deck_id, enemygroup_id,
+                 deck_json_path=None,
+                 enemygroup_json_path=None,
+                 max_enemies=8,
+                 max_turns=None,
+                 if_battle_log=False,
+                 seed=None):
+        # max_enemies bounds the targetable enemy slots, enemies spawned past it are still attacked
+        # by all_enemies and random_enemy cards. max_turns truncates an episode, None never does
+        self.registry = get_registry(deck_path=deck_json_path, group_path=enemygroup_json_path)
+        deck, self.deck_name = self.registry.deck(deck_id)
+        enemies, self.enemygroup_name = self.registry.enemy_group(enemygroup_id)
+        self.player = Player(name="Hero", hp=80, energy=3, strategy=RandomStrategy())
+        self.battle = Battle(self.player, enemies, deck, card_pool=self.registry.card_pool,
+                             if_battle_log=if_battle_log, registry=self.registry, seed=seed)
+        self.hand_limit = self.battle.hand_limit
+        self.max_enemies = max_enemies
+        self.max_turns = max_turns
+        self.num_actions = self.hand_limit * max_enemies + 1
+        self.end_turn_action = self.num_actions - 1
+        # pile counts are kept up to date by the battle's pile notifications, see observation.py
+        self.encoder = ObservationEncoder(self.registry, max_enemies=max_enemies, hand_limit=self.hand_limit)
+        self.encoder.attach(self.battle)
+        self.observation_size = self.encoder.size
+        self.done = True
+
+    def reset(self, seed=None, out=None):
+        # returns (observation, info); info["action_mask"] is the mask for the first step
+        battle = self.battle
+        battle.reset(seed=seed)
+        battle.battle_start()
+        self.done = False
+        self._begin_turn()
+        return self.observe(out), self._info()
+
+    def step(self, action, out=None):
+        # returns (observation, reward, terminated, truncated, info); reward is 1 for a win, -1 for a loss
+        if self.done:
+            raise ValueError("[Env Error] step() called on a finished battle, call reset() first.")
+        battle = self.battle
+        if action == self.end_turn_action:
+            finished = self._end_turn()
+        else:
+            card, targets = self._decode(action)
+            if card is None:
+                raise ValueError(f"[Env Error] Action {action} is not legal in this state.")
+            battle.play_card(card, self.player, targets)
+            condition = battle.victory_condition
+            if condition.is_victory(self.player, battle.enemies, battle.turn) or \
+                    condition.is_defeat(self.player, battle.enemies, battle.turn):
+                # decided mid-turn: close the turn the way Battle.run does before recording the result
+                battle.finish_player_turn()
+                battle.check_victory()
+                finished = True
+            else:
+                finished = False
+
+        reward = 0.0
+        truncated = False
+        if finished:
+            reward = 1.0 if self.player.hp > 0 else -1.0
+            self.done = True
+        elif self.max_turns is not None and battle.turn > self.max_turns:
+            truncated = True
+            self.done = True
+        # encoded before finish_battle() clears the piles, so the last observation is the final state
+        obs = self.observe(out)
+        if finished:
+            battle.finish_battle()
+        return obs, reward, finished, truncated, self._info()
+
+    def snapshot(self):
+        # the current step for lookahead, see Battle.snapshot
+        return self.battle.snapshot(), self.done
+
+    def restore(self, snap):
+        battle_snap, self.done = snap
+        self.battle.restore(battle_snap)
+
+    def _begin_turn(self):
+        self.battle.next_turn()
+        self.battle.start_player_turn()
+
+    def _end_turn(self):
+        # the rest of one turn of Battle.run after the player's card plays; True once decided
+        battle = self.battle
+        battle.finish_player_turn()
+        if battle.resolve_turn():
+            return True
+        self._begin_turn()
+        return False
+
+    def _decode(self, action):
+        # (card, targets) for a legal action, (None, None) otherwise
+        slot, enemy_slot = divmod(action, self.max_enemies)
+        battle = self.battle
+        if not 0 <= slot < len(battle.hand):
+            return None, None
+        card = battle.hand[slot]
+        if not _playable(card, self.player):
+            return None, None
+        if card.target_selector == "single_enemy":
+            if enemy_slot >= len(battle.enemies) or battle.enemies[enemy_slot].hp <= 0:
+                return None, None
+            return card, [battle.enemies[enemy_slot]]
+        if enemy_slot != 0:
+            return None, None
+        targets = self.player.strategy.select_target(card, self.player, battle.enemies, battle)
+        return (card, targets) if targets else (None, None)
+
+    def action_mask(self, out=None):
+        mask = np.zeros(self.num_actions, dtype=bool) if out is None else out
+        mask[:] = False
+        if self.done:
+            return mask
+        battle = self.battle
+        alive = [i for i, enemy in enumerate(battle.enemies[:self.max_enemies]) if enemy.hp > 0]
+        has_target = any(enemy.hp > 0 for enemy in battle.enemies)
+        for slot, card in enumerate(battle.hand[:self.hand_limit]):
+            if not _playable(card, self.player):
+                continue
+            base = slot * self.max_enemies
+            selector = card.target_selector
+            if selector == "single_enemy":
+                for i in alive:
+                    mask[base + i] = True
+            elif selector == "self" or (has_target and selector in ("all_enemies", "random_enemy", "lowest_hp")):
+                mask[base] = True
+        mask[self.end_turn_action] = True
+        return mask
+
+    def observe(self, out=None):
+        # float32 of observation_size, laid out as described in observation.py
+        return self.encoder.encode(out)
+
+    def _info(self):
+        info = {"action_mask": self.action_mask(), "turn": self.battle.turn}
+        if self.done:
+            info["win"] = self.player.hp > 0
+            info["final_hp"] = self.player.hp
+        return info
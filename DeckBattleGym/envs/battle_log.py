@@ -0,0 +1,211 @@
+from DeckBattleGym.envs.utils import copy_entries
+
+
+# Battle events are tuples (kind, *fields) appended while the battle runs. Fields hold numbers,
+# names, cards and entities (only their id and name are read back, which never change), so nothing
+# is formatted until the text, simulation_log or replay view is asked for.
+
+# verbosity levels: SUMMARY is always recorded, DETAIL and STATE only with if_battle_log
+SUMMARY, DETAIL, STATE = 0, 1, 2
+
+TURN = "turn"                    # (TURN, turn)
+PLAYER_TURN = "player_turn"      # (PLAYER_TURN, turn)
+NO_DRAW = "no_draw"              # (NO_DRAW,)
+HAND_LIMIT = "hand_limit"        # (HAND_LIMIT,)
+DRAW = "draw"                    # (DRAW, turn, drawn cards)
+HAND_CARDS = "hand_cards"        # (HAND_CARDS, turn, hand cards) after a draw
+HAND = "hand"                    # (HAND, turn, hand cards) once per turn, after the turn's draw
+PLAY = "play"                    # (PLAY, user name, card, targets)
+ENTANGLED = "entangled"          # (ENTANGLED,)
+SKIP = "skip"                    # (SKIP, card or None when nothing is playable)
+LOSE_STRENGTH = "lose_strength"  # (LOSE_STRENGTH, name, amount)
+GAIN_STRENGTH = "gain_strength"  # (GAIN_STRENGTH, name, amount)
+END_BLOCK = "end_block"          # (END_BLOCK, block)
+END_HAND = "end_hand"            # (END_HAND, hand cards)
+TURN_END = "turn_end"            # (TURN_END, turn, player hp)
+ENEMY_TURN = "enemy_turn"        # (ENEMY_TURN, turn)
+AUTO_DEATH = "auto_death"        # (AUTO_DEATH, enemy name, turn)
+CREATED = "created"              # (CREATED, card, destination)
+REAPED = "reaped"                # (REAPED, hp)
+INSERT = "insert"                # (INSERT, enemy name, amount, card, destination)
+SPLIT = "split"                  # (SPLIT, enemy name, amount, enemy id)
+STATE_SNAPSHOT = "state"         # (STATE_SNAPSHOT, turn, player state, enemy states)
+RESULT = "result"                # (RESULT, win)
+FINISH = "finish"                # (FINISH, final hp, turns taken)
+
+LEVELS = {
+    TURN: DETAIL, PLAYER_TURN: DETAIL, NO_DRAW: DETAIL, HAND_LIMIT: DETAIL, DRAW: DETAIL,
+    HAND_CARDS: DETAIL, HAND: SUMMARY, PLAY: SUMMARY, ENTANGLED: DETAIL, SKIP: DETAIL,
+    LOSE_STRENGTH: DETAIL, GAIN_STRENGTH: DETAIL, END_BLOCK: DETAIL, END_HAND: DETAIL,
+    TURN_END: SUMMARY, ENEMY_TURN: DETAIL, AUTO_DEATH: DETAIL, CREATED: DETAIL, REAPED: DETAIL,
+    INSERT: DETAIL, SPLIT: DETAIL, STATE_SNAPSHOT: STATE, RESULT: SUMMARY, FINISH: SUMMARY,
+}
+
+
+def _names(cards):
+    return ", ".join(card.name for card in cards)
+
+
+def _play_text(user_name, card, targets):
+    if targets:
+        return f"[Play] {user_name} plays {card.name} targeting {', '.join(t.name for t in targets)}."
+    return f"[Play] {user_name} plays {card.name} with no target."
+
+
+def _state_text(turn, player, enemies):
+    hp, block, buffs, debuffs, powers = player
+    lines = [f"[Turn {turn} End] Player HP: {hp}, Block: {block}, Buffs: {buffs}, Debuffs: {debuffs}, Powers: {powers}"]
+    for name, hp, block, buffs, debuffs in enemies:
+        lines.append(f"Enemy: {name}(HP: {hp}, Block:{block}, Buffs: {buffs}, Debuffs: {debuffs})")
+    return lines
+
+
+# kind -> fn(*fields) returning the text line (or a list of lines), None for events that only feed the other views
+_TEXT = {
+    TURN: lambda turn: f"\n--- Turn {turn} ---",
+    PLAYER_TURN: lambda turn: f"\n[Turn {turn}] Player's turn begins.",
+    NO_DRAW: lambda: "Prevented from drawing cards this turn.",
+    HAND_LIMIT: lambda: "[Draw] Hand limit reached. Cannot draw more cards.",
+    DRAW: lambda turn, cards: f"[Turn {turn}] Drew cards: {_names(cards)}",
+    HAND_CARDS: lambda turn, cards: f"[Turn {turn}] Hand cards: {_names(cards)}",
+    HAND: lambda turn, cards: None,
+    PLAY: _play_text,
+    ENTANGLED: lambda: "[Entangled] Not allowed to play attack cards",
+    SKIP: lambda card: f"[Skip] {card.name} is not playable." if card is not None else "[Skip] No playable cards this turn.",
+    LOSE_STRENGTH: lambda name, amount: f"[EndTurn] {name} loses {amount} Strength.",
+    GAIN_STRENGTH: lambda name, amount: f"[EndTurn] {name} gaines {amount} Strength.",
+    END_BLOCK: lambda block: f"[EndTurn] Player has {block} Block",
+    END_HAND: lambda cards: f"[EndTurn] Hand cards: {_names(cards)}",
+    TURN_END: lambda turn, hp: None,
+    ENEMY_TURN: lambda turn: f"[Turn {turn}] Enemies' turn begins.",
+    AUTO_DEATH: lambda name, turn: f"[AutoDeath] {name} dies automatically after turn {turn}.",
+    CREATED: lambda card, destination: f"[Effect] Created {card.name} in {destination}.",
+    REAPED: lambda hp: f"[Effect] Reaped {hp}",
+    INSERT: lambda name, amount, card, destination: f"[Intent] {name} inserts {amount}x '{card.name}' into player's {destination} pile.",
+    SPLIT: lambda name, amount, enemy_id: f"[Intent] {name} splits into {amount} {enemy_id}s!",
+    STATE_SNAPSHOT: _state_text,
+    RESULT: lambda win: "[Battle] You win!" if win else "[Battle] You lose!",
+    FINISH: lambda hp, turns: None,
+}
+
+
+def state_snapshot(turn, player, enemies):
+    return (
+        STATE_SNAPSHOT, turn,
+        (player.hp, player.block, copy_entries(player.buffs), copy_entries(player.debuffs), dict(player.powers)),
+        tuple((e.name, e.hp, e.block, copy_entries(e.buffs), copy_entries(e.debuffs)) for e in enemies)
+    )
+
+
+class BattleLog(list):
+    # A list of event tuples. Plain strings may still be appended and come out of lines() as they are.
+
+    def events(self, level=STATE):
+        return [event for event in self if isinstance(event, str) or LEVELS[event[0]] <= level]
+
+    def lines(self, level=STATE):
+        for event in self:
+            if isinstance(event, str):
+                if level >= DETAIL:
+                    yield event
+                continue
+            kind = event[0]
+            if LEVELS[kind] > level:
+                continue
+            text = _TEXT[kind](*event[1:])
+            if text is None:
+                continue
+            if isinstance(text, str):
+                yield text
+            else:
+                yield from text
+
+    def __str__(self):
+        return "\n".join(self.lines())
+
+    def turns(self):
+        # (turn, hand cards, [(card, targets)], hp left) per player turn
+        turns = []
+        current = None
+        for event in self:
+            if isinstance(event, str):
+                continue
+            kind = event[0]
+            if kind == HAND:
+                current = (event[1], event[2], [], None)
+            elif kind == PLAY:
+                if current is not None:
+                    current[2].append((event[2], event[3]))
+            elif kind == TURN_END:
+                if current is not None:
+                    turns.append(current[:3] + (event[2],))
+                current = None
+        return turns
+
+    def result(self):
+        # (win, final hp, turns taken), each None until the battle got that far
+        win, final_hp, turns_taken = None, None, None
+        for event in reversed(self):
+            if isinstance(event, str):
+                continue
+            if event[0] == FINISH and final_hp is None:
+                final_hp, turns_taken = event[1], event[2]
+            elif event[0] == RESULT:
+                win = event[1]
+                break
+        return win, final_hp, turns_taken
+
+    def simulation_log(self):
+        # one pass straight to dicts, this runs once per simulated battle
+        turns = []
+        current = actions = None
+        win = final = None
+        for event in self:
+            if type(event) is str:
+                continue
+            kind = event[0]
+            if kind == PLAY:
+                if actions is not None:
+                    actions.append({"card": event[2].id, "targets": [getattr(t, "id", "unknown") for t in event[3]]})
+            elif kind == HAND:
+                actions = []
+                current = {"turn": event[1], "hand": [card.id for card in event[2]], "actions": actions}
+            elif kind == TURN_END:
+                if current is not None:
+                    current["hp_left"] = event[2]
+                    turns.append(current)
+                current = actions = None
+            elif kind == RESULT:
+                win = event[1]
+            elif kind == FINISH:
+                final = event
+        log = {"turns": turns}
+        if win is not None or final is not None:
+            log["win"] = bool(win)
+        if final is not None:
+            log["final_hp"] = final[1]
+            log["turns_taken"] = final[2]
+        return log
+
+    def replay(self):
+        # per turn: the drawn hand and the plays by card id and name, plus the end-of-turn state when recorded
+        steps = []
+        states = {event[1]: event for event in self if not isinstance(event, str) and event[0] == STATE_SNAPSHOT}
+        for turn, hand, actions, hp_left in self.turns():
+            step = {
+                "turn": turn,
+                "hand": [(card.id, card.name) for card in hand],
+                "actions": [((card.id, card.name), [(getattr(t, "id", "unknown"), t.name) for t in targets])
+                            for card, targets in actions],
+                "hp_left": hp_left
+            }
+            state = states.get(turn)
+            if state is not None:
+                hp, block, buffs, debuffs, powers = state[2]
+                step["state"] = {
+                    "player": {"hp": hp, "block": block, "buffs": buffs, "debuffs": debuffs, "powers": powers},
+                    "enemies": [{"name": name, "hp": hp, "block": block, "buffs": buffs, "debuffs": debuffs}
+                                for name, hp, block, buffs, debuffs in state[3]]
+                }
+            steps.append(step)
+        return steps
@@ -1,10 +1,13 @@
-import random
 from copy import deepcopy
 from DeckBattleGym.envs.effectcalculator import EffectCalculator
 from DeckBattleGym.envs.utils import get_buff_value, get_debuff_value, has_buff, has_debuff
+from DeckBattleGym.envs.battle_log import CREATED, REAPED
 
 
 class Card:
+    __slots__ = ("id", "name", "cost", "effects", "card_type", "rarity", "playable", "target_selector",
+                 "ethereal", "exhaust", "innate", "retain", "shuffle_back", "ops")
+
     def __init__(self, id, name, cost, effects, card_type,
                  rarity=None,
                  playable=True,
@@ -13,7 +16,8 @@ class Card:
                  exhaust=False, 
                  innate=False, 
                  retain=False, 
-                 shuffle_back=False):
+                 shuffle_back=False,
+                 ops=None):
         self.id = id
         self.name = name
         self.cost = cost
@@ -27,25 +31,39 @@ class Card:
         self.innate = innate
         self.retain = retain
         self.shuffle_back = shuffle_back
+        # templates pass their compiled ops in, so copies of a card share one tuple
+        self.ops = ops if ops is not None else compile_effects(effects)
 
     def apply(self, user, targets, battle=None):
         if not targets:
             raise ValueError(f"[CardError] Card '{self.name}' expected at least one target but got: {targets}.")
-        
-        for effect in self.effects:
-            if isinstance(effect, GenerateCardEffect) or isinstance(effect, DrawEffect):
-                effect.apply(user, target, battle=battle)
-            else:
+
+        for op, per_target in self.ops:
+            if per_target:
                 for target in targets:
-                    effect.apply(user, target, battle=battle)
+                    op(user, target, battle)
+            else:
+                op(user, targets[0], battle)
 
 
 class CardEffect:
+    __slots__ = ()
+
+    # False for effects that act once per play however many targets were picked
+    per_target = True
+
     def apply(self, user, target, battle=None):
         raise NotImplementedError
 
 
+def compile_effects(effects):
+    # flattened once per card into (bound apply, per_target) pairs, so a play does no type checks
+    return tuple((effect.apply, effect.per_target) for effect in effects)
+
+
 class AttackEffect(CardEffect):
+    __slots__ = ("amount",)
+
     def __init__(self, amount):
         self.amount = amount
 
@@ -54,6 +72,8 @@ class AttackEffect(CardEffect):
         target.take_damage(damage)
 
 class BlockEffect(CardEffect):
+    __slots__ = ("amount",)
+
     def __init__(self, amount):
         self.amount = amount
 
@@ -63,6 +83,8 @@ class BlockEffect(CardEffect):
 
 
 class BlockBasedAttack(CardEffect):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__()
 
@@ -72,6 +94,8 @@ class BlockBasedAttack(CardEffect):
 
 
 class BuffEffect(CardEffect):
+    __slots__ = ("name", "value", "duration")
+
     def __init__(self, name, value, duration=None):
         self.name = name
         self.value = value
@@ -82,6 +106,8 @@ class BuffEffect(CardEffect):
 
 
 class DebuffEffect(CardEffect):
+    __slots__ = ("name", "duration", "value")
+
     def __init__(self, name, duration, value=None):
         self.name = name
         self.duration = duration
@@ -92,11 +118,15 @@ class DebuffEffect(CardEffect):
 
 
 class DoubleBlockEffect(CardEffect):
+    __slots__ = ()
+
     def apply(self, user, target, battle=None):
         user.block *= 2
 
 
 class DoubleStrengthEffect(CardEffect):
+    __slots__ = ()
+
     def apply(self, user, target, battle=None):
         current = get_buff_value(user, "Strength")
         if current > 0:
@@ -106,6 +136,9 @@ class DoubleStrengthEffect(CardEffect):
 
 
 class DrawEffect(CardEffect):
+    __slots__ = ("amount",)
+    per_target = False
+
     def __init__(self, amount):
         self.amount = amount
 
@@ -116,6 +149,8 @@ class DrawEffect(CardEffect):
 
 
 class EnergyEffect(CardEffect):
+    __slots__ = ("amount",)
+
     def __init__(self, amount):
         self.amount = amount
 
@@ -124,6 +159,8 @@ class EnergyEffect(CardEffect):
 
 
 class ExhaustByTypeEffect(CardEffect):
+    __slots__ = ("block_per_card", "attack_per_card", "exclude_types", "include_types")
+
     def __init__(self, block_per_card=0, 
                  attack_per_card=0,
                  exclude_types=None,
@@ -142,9 +179,8 @@ class ExhaustByTypeEffect(CardEffect):
             to_exhaust = [card for card in battle.hand if card.card_type not in self.exclude_types]
 
         for card in to_exhaust:
-            battle.hand.remove(card)
-            battle.exhaust_pile.append(card)
-            user.trigger_on_exhaust(battle)
+            battle.move_card(card, "hand", "exhaust_pile")
+            user.trigger_on_exhaust(battle, card)
             count += 1
 
         if self.block_per_card > 0:
@@ -157,31 +193,35 @@ class ExhaustByTypeEffect(CardEffect):
 
 
 class GenerateCardEffect(CardEffect):
+    __slots__ = ("card_id", "amount", "destination")
+    per_target = False
+
     def __init__(self, card_id, amount=1, destination="hand"):
         self.card_id = card_id
         self.amount = amount
         self.destination = destination  # "hand", "draw", "discard"
 
     def apply(self, user, target, battle=None):
-        card_template = battle.card_id_map[self.card_id]  
         for _ in range(self.amount):
-            card = Card(**card_template)
+            card = battle.registry.card(self.card_id)
             if self.destination == "hand":
                 if len(battle.hand) < battle.hand_limit:
-                    battle.hand.append(card)
+                    battle.move_card(card, dst="hand")
                 else:
-                    battle.discard_pile.append(card) 
+                    battle.move_card(card, dst="discard_pile")
             elif self.destination == "draw":
-                index = random.randint(0, len(battle.deck))
-                battle.deck.insert(index, card)
+                index = battle.rng.randint(0, len(battle.deck))
+                battle.move_card(card, dst="deck", index=index)
             elif self.destination == "discard":
-                battle.discard_pile.append(card)
+                battle.move_card(card, dst="discard_pile")
 
             if battle.if_battle_log:
-                battle.log.append(f"[Effect] Created {card.name} in {self.destination}.")
+                battle.log.append((CREATED, card, self.destination))
 
 
 class HPEffect(CardEffect):
+    __slots__ = ("amount",)
+
     def __init__(self, amount):
         self.amount = amount
 
@@ -191,18 +231,19 @@ class HPEffect(CardEffect):
 
 
 class PowerEffect(CardEffect):
+    __slots__ = ("name", "value")
+
     def __init__(self, name, value=1):
         self.name = name
         self.value = value
 
     def apply(self, user, target, battle=None):
-        if self.name in user.powers:
-            user.powers[self.name] += self.value
-        else:
-            user.powers[self.name] = self.value
+        user.add_power(self.name, self.value)
 
 
 class ReaperAttackEffect(CardEffect):
+    __slots__ = ("ratio", "attack")
+
     def __init__(self, ratio=1, attack=1):
         self.ratio =ratio
         self.attack = attack
@@ -215,16 +256,18 @@ class ReaperAttackEffect(CardEffect):
         hp_new= user.hp + hp_reaped * self.ratio
         user.hp=min(hp_new, user.max_hp)
         if battle.if_battle_log:
-            battle.log.append(f"[Effect] Reaped {hp_reaped}")
+            battle.log.append((REAPED, hp_reaped))
 
 
 class StatusEffect(CardEffect):
+    __slots__ = ("name", "temporary")
+
     def __init__(self, name, temporary=True):
         self.name = name
         self.temporary = temporary
 
     def apply(self, user, target, battle=None):
-        if "status_flags" not in user.__dict__:
+        if user.status_flags is None:
             user.status_flags = {}
         user.status_flags[self.name] = {
             "value": True,
@@ -233,13 +276,16 @@ class StatusEffect(CardEffect):
 
 
 class XAttackEffect(CardEffect):
+    __slots__ = ("damage_per_hit",)
+
     def __init__(self,damage_per_hit):
         self.damage_per_hit = damage_per_hit
 
     def apply(self, user, target, battle=None):
         x_value=user.energy
+        # nothing a hit does changes the modifiers, so the damage is worked out once
+        damage = EffectCalculator.modified_damage(self.damage_per_hit, attacker=user, defender=target)
         for _ in range(x_value):
-            damage = EffectCalculator.modified_damage(self.damage_per_hit, attacker=user, defender=target)
             target.take_damage(damage)
 
 
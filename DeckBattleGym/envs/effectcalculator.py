@@ -1,32 +1,31 @@
-from DeckBattleGym.envs.utils import get_buff_value, get_debuff_value, has_buff, has_debuff
-
-
 class EffectCalculator:
-    
+    # modifiers come cached from each entity's StatusBlock, this runs for every hit and every block gain
+
     @staticmethod
     def modified_damage(base_damage, attacker, defender):
-        damage = base_damage
-
-        damage += get_buff_value(attacker, "Strength")
+        strength, _, weak, _, _, _ = attacker.status.modifiers or attacker.status.refresh()
+        _, _, _, vulnerable, _, intangible = defender.status.modifiers or defender.status.refresh()
+        damage = base_damage + strength
 
-        if has_debuff(attacker, "Weak"):
+        if weak:
             damage = int(damage * 0.75)
 
-        if has_buff(defender, "Intangible"):
+        if intangible:
             damage = min(damage, 1)
 
-        if has_debuff(defender, "Vulnerable"):
+        if vulnerable:
             damage = int(damage * 1.5)
 
         return max(0, damage)
 
     @staticmethod
     def modified_block(base_block, user):
+        _, dexterity, _, _, frail, _ = user.status.modifiers or user.status.refresh()
         block = base_block
 
-        if has_debuff(user, "Frail"):
+        if frail:
             block = int(block * 0.75)
 
-        block += get_buff_value(user, "Dexterity")
+        block += dexterity
 
         return max(0, block)
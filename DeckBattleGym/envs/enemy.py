@@ -1,10 +1,16 @@
-import random
+import copy
+from time import perf_counter
 from DeckBattleGym.envs.effectcalculator import EffectCalculator
-from DeckBattleGym.envs.utils import resolve_target_selector
+from DeckBattleGym.envs.utils import copy_entries, resolve_target_selector
+from DeckBattleGym.envs.status import StatusBlock
+from DeckBattleGym.envs.battle_log import LOSE_STRENGTH, GAIN_STRENGTH, INSERT, SPLIT
 from DeckBattleGym.envs.buff_n_debuff import apply_regen, tick_poison, tick_standard_duration
 
 
 class Enemy:
+    __slots__ = ("id", "name", "hp", "max_hp", "block", "prev_hp", "status", "buffs", "debuffs", "intent_sq",
+                 "intent_index", "tags", "die_after_turn", "enemy_group", "status_flags", "initial_state")
+
     def __init__(self, id, name, hp, max_hp,
                  block=0,
                  buffs=None, 
@@ -18,13 +24,48 @@ class Enemy:
         self.max_hp = max_hp or hp
         self.block = block or 0
         self.prev_hp = hp
-        self.buffs = buffs or {}
-        self.debuffs = debuffs or {}
+        # buffs/debuffs are the dict-like halves of the StatusBlock, replace their contents rather than the objects
+        self.status = StatusBlock(buffs, debuffs)
+        self.buffs = self.status.buffs
+        self.debuffs = self.status.debuffs
         self.intent_sq = intent_sq
         self.intent_index = 0
         self.tags = tags
         self.die_after_turn=die_after_turn
         self.enemy_group = []
+        self.status_flags = None
+        self.initial_state = (self.hp, self.block, copy_entries(self.buffs), copy_entries(self.debuffs))
+
+    def reset(self):
+        hp, block, buffs, debuffs = self.initial_state
+        self.hp = hp
+        self.prev_hp = hp
+        self.block = block
+        self.buffs.replace(buffs)
+        self.debuffs.replace(debuffs)
+        self.intent_index = 0
+        self.status_flags = None
+
+    # Battle.snapshot/restore/fork; intents are shared, only the position in intent_sq is kept
+    def snapshot(self):
+        flags = None if self.status_flags is None else dict(self.status_flags)
+        return (self.hp, self.prev_hp, self.block, copy_entries(self.buffs), copy_entries(self.debuffs),
+                self.intent_index, flags)
+
+    def restore(self, state):
+        self.hp, self.prev_hp, self.block, buffs, debuffs, self.intent_index, flags = state
+        self.buffs.replace(buffs)
+        self.debuffs.replace(debuffs)
+        self.status_flags = None if flags is None else dict(flags)
+
+    def fork(self):
+        clone = copy.copy(self)
+        clone.status = StatusBlock(self.buffs, self.debuffs)
+        clone.buffs = clone.status.buffs
+        clone.debuffs = clone.status.debuffs
+        if self.status_flags is not None:
+            clone.status_flags = dict(self.status_flags)
+        return clone
     
     def set_group(self, group):
         self.enemy_group = group
@@ -40,13 +81,13 @@ class Enemy:
             if "Strength" in self.buffs:
                 self.buffs["Strength"]["value"] = self.buffs["Strength"]["value"] - amount
                 if battle is not None and battle.if_battle_log:
-                    battle.log.append(f"[EndTurn] {self.name} loses {amount} Strength.")
+                    battle.log.append((LOSE_STRENGTH, self.name, amount))
             del self.debuffs["LoseStrength"]
         if "GainStrength" in self.buffs:
             amount = self.buffs["GainStrength"].get("value",0)
             self.apply_buff(name="Strength", value=amount)
             if battle is not None and battle.if_battle_log:
-                battle.log.append(f"[EndTurn] {self.name} gaines {amount} Strength.")
+                battle.log.append((GAIN_STRENGTH, self.name, amount))
                 
     def tick_buffs_and_debuffs(self, battle=None):
         # Buffs
@@ -76,31 +117,10 @@ class Enemy:
         self.block += amount
     
     def apply_buff(self, name, value, duration=None):
-        if name not in self.buffs:
-            self.buffs[name] = {"value": 0}
-
-        self.buffs[name]["value"] += value
-
-        if duration is not None:
-            if "duration" in self.buffs[name]:
-                self.buffs[name]["duration"] += duration
-            else:
-                self.buffs[name]["duration"] = duration
+        self.status.apply_buff(name, value, duration)
 
     def apply_debuff(self, name, duration, value=None):
-        if "Artifact" in self.buffs and self.buffs["Artifact"]["value"] > 0:
-            self.buffs["Artifact"]["value"] -= 1
-            return
-        if name not in self.debuffs:
-            self.debuffs[name] = {"duration": 0}
-
-        self.debuffs[name]["duration"] += duration
-
-        if value is not None:
-            if "value" in self.debuffs[name]:
-                self.debuffs[name]["value"] += value
-            else:
-                self.debuffs[name]["value"] = value
+        self.status.apply_debuff(name, duration, value)
 
     def heal(self, amount):
         self.hp = min(self.max_hp, self.hp + amount)
@@ -121,16 +141,27 @@ class Enemy:
         intents = self.intent_sq[self.intent_index % len(self.intent_sq)]
         self.intent_index += 1
         
+        profiler = getattr(battle, "profiler", None)
+        if profiler is None:
+            for intent in intents:
+                intent.execute(self, battle)
+            return
         for intent in intents:
+            start = perf_counter()
             intent.execute(self, battle)
+            profiler.add_intent(type(intent).__name__, perf_counter() - start)
 
 
 class EnemyIntent:
+    __slots__ = ()
+
     def execute(self, user, battle):
         raise NotImplementedError
     
 
 class AttackIntent(EnemyIntent):
+    __slots__ = ("amount",)
+
     def __init__(self, amount):
         self.amount = amount
 
@@ -139,6 +170,8 @@ class AttackIntent(EnemyIntent):
         battle.player.take_damage(damage)
 
 class BlockIntent(EnemyIntent):
+    __slots__ = ("amount", "target_selector")
+
     def __init__(self, amount, target_selector="self"):
         self.amount = amount
         self.target_selector = target_selector
@@ -150,6 +183,8 @@ class BlockIntent(EnemyIntent):
             target.gain_block(block)
 
 class BuffIntent(EnemyIntent):
+    __slots__ = ("name", "value", "duration", "target_selector")
+
     def __init__(self, name, value, duration=None, target_selector="self"):
         self.name = name
         self.value = value
@@ -162,6 +197,8 @@ class BuffIntent(EnemyIntent):
             target.apply_buff(self.name, self.value, self.duration)
 
 class DebuffIntent(EnemyIntent):
+    __slots__ = ("name", "duration", "value")
+
     def __init__(self, name, duration, value=None):
         self.name = name
         self.duration = duration
@@ -171,6 +208,8 @@ class DebuffIntent(EnemyIntent):
         battle.player.apply_debuff(self.name, self.duration, self.value)
 
 class HealIntent(EnemyIntent):
+    __slots__ = ("amount", "target_selector")
+
     def __init__(self, amount, target_selector="self"):
         self.amount = amount
         self.target_selector = target_selector
@@ -181,42 +220,41 @@ class HealIntent(EnemyIntent):
             target.heal(self.amount)
 
 class InsertCardIntent(EnemyIntent):
+    __slots__ = ("card_id", "amount", "destination")
+
     def __init__(self, card_id, amount=1, destination="discard"):
         self.card_id = card_id
         self.amount = amount
         self.destination = destination
 
     def execute(self, user, battle):
-        from DeckBattleGym.envs.card import Card
-
         for _ in range(self.amount):
-            card_template = battle.card_id_map[self.card_id]
-            card = Card(**card_template)
+            card = battle.registry.card(self.card_id)
             if self.destination == "discard":
-                battle.discard_pile.append(card)
+                battle.move_card(card, dst="discard_pile")
             elif self.destination == "draw":
-                index = random.randint(0, len(battle.deck))
-                battle.deck.insert(index, card)
+                index = battle.rng.randint(0, len(battle.deck))
+                battle.move_card(card, dst="deck", index=index)
             elif self.destination == "hand":
                 if len(battle.hand) < battle.hand_limit:
-                    battle.hand.append(card)
+                    battle.move_card(card, dst="hand")
                 else:
-                    battle.discard_pile.append(card)
+                    battle.move_card(card, dst="discard_pile")
         if battle.if_battle_log:
-            battle.log.append(f"[Intent] {user.name} inserts {self.amount}x '{card.name}' into player's {self.destination} pile.")
+            battle.log.append((INSERT, user.name, self.amount, card, self.destination))
 
 class SpawnIntent(EnemyIntent):
+    __slots__ = ("summon_enemy_id", "amount")
+
     def __init__(self, summon_enemy_id, amount=2):
         self.summon_enemy_id = summon_enemy_id
         self.amount = amount
 
     def execute(self, user, battle):
-        from DeckBattleGym.envs.loader import load_enemy_by_id 
-
         for _ in range(self.amount):
-            mid_slime = load_enemy_by_id(self.summon_enemy_id)
+            mid_slime = battle.registry.enemy(self.summon_enemy_id)
             mid_slime.hp = user.hp
             battle.enemies.append(mid_slime)
         user.hp = 0
         if battle.if_battle_log:
-            battle.log.append(f"[Intent] {user.name} splits into {self.amount} {self.summon_enemy_id}s!")
\ No newline at end of file
+            battle.log.append((SPLIT, user.name, self.amount, self.summon_enemy_id))
\ No newline at end of file
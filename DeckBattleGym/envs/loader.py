@@ -1,158 +1,248 @@
 import os
 import json
 import random
-from DeckBattleGym.envs.card import Card, AttackEffect,XAttackEffect,BlockEffect,BlockBasedAttack, BuffEffect, DebuffEffect, DrawEffect, EnergyEffect, HPEffect, ReaperAttackEffect, DoubleBlockEffect, DoubleStrengthEffect, PowerEffect, StatusEffect, ExhaustByTypeEffect, GenerateCardEffect
+from types import MappingProxyType
+from DeckBattleGym.envs.card import Card, AttackEffect,XAttackEffect,BlockEffect,BlockBasedAttack, BuffEffect, DebuffEffect, DrawEffect, EnergyEffect, HPEffect, ReaperAttackEffect, DoubleBlockEffect, DoubleStrengthEffect, PowerEffect, StatusEffect, ExhaustByTypeEffect, GenerateCardEffect, compile_effects
 from DeckBattleGym.envs.enemy import Enemy, AttackIntent,BlockIntent,BuffIntent,DebuffIntent,HealIntent,InsertCardIntent,SpawnIntent
 
 
+# effect type -> parser; keys are the "effect" field of card.json
+_EFFECT_PARSERS = {
+    "attack": lambda d: AttackEffect(amount=d["value"]),
+    "x_attack": lambda d: XAttackEffect(damage_per_hit=d["value"]),
+    "block": lambda d: BlockEffect(amount=d["value"]),
+    "buff": lambda d: BuffEffect(
+        name=d["name"],
+        value=d["value"],
+        duration=d.get("duration", None)
+    ),
+    "debuff": lambda d: DebuffEffect(
+        name=d["name"],
+        duration=d["duration"],
+        value=d.get("value", None)
+    ),
+    "draw": lambda d: DrawEffect(amount=d["value"]),
+    "energy": lambda d: EnergyEffect(amount=d["value"]),
+    "hp": lambda d: HPEffect(amount=d["value"]),
+    "reaper": lambda d: ReaperAttackEffect(
+        ratio=d.get("ratio", 1),
+        attack=d.get("attack", 1)
+    ),
+    "power": lambda d: PowerEffect(
+        name=d["name"],
+        value=d.get("value", 1)
+    ),
+    "double_block": lambda d: DoubleBlockEffect(),
+    "double_strength": lambda d: DoubleStrengthEffect(),
+    "exhaust_by_type": lambda d: ExhaustByTypeEffect(
+        block_per_card=d.get("block_per_card", 0),
+        attack_per_card=d.get("attack_per_card", 0),
+        exclude_types=d.get("exclude_types", []),
+        include_types=d.get("include_types")
+    ),
+    "status": lambda d: StatusEffect(
+        name=d["name"],
+        temporary=d.get("temporary", True)
+    ),
+    "generate_card": lambda d: GenerateCardEffect(
+        card_id=d["card_id"],
+        amount=d.get("amount", 1),
+        destination=d.get("destination", "hand")
+    ),
+    "block_attack": lambda d: BlockBasedAttack(),
+}
+
+# intent type -> parser; keys are the "type" field of enemy.json
+_INTENT_PARSERS = {
+    "attack": lambda d: AttackIntent(amount=d["value"]),
+    "block": lambda d: BlockIntent(
+        amount=d["value"],
+        target_selector=d.get("target_selector", "self")
+    ),
+    "buff": lambda d: BuffIntent(
+        name=d["name"],
+        target_selector=d.get("target_selector", "self"),
+        value=d["value"],
+        duration=d.get("duration", None)
+    ),
+    "debuff": lambda d: DebuffIntent(
+        name=d["name"],
+        duration=d["duration"],
+        value=d.get("value", None)
+    ),
+    "heal": lambda d: HealIntent(
+        amount=d["value"],
+        target_selector=d.get("target_selector", "self")
+    ),
+    "insert_card": lambda d: InsertCardIntent(
+        card_id=d["card_id"],
+        amount=d.get("amount", 1),
+        destination=d.get("destination", "discard")
+    ),
+    "spawn": lambda d: SpawnIntent(
+        summon_enemy_id=d["summon_enemy_id"],
+        amount=d.get("amount", 2)
+    ),
+}
+
+
+def register_effect_type(effect_type, parser):
+    # parser takes the effect dict and returns a CardEffect; register before the registry is built,
+    # templates are parsed once and cached
+    _EFFECT_PARSERS[effect_type] = parser
+
+
+def register_intent_type(intent_type, parser):
+    _INTENT_PARSERS[intent_type] = parser
+
+
 def parse_effect(effect_dict):
     effect_type = effect_dict["effect"]
-
-    if effect_type == "attack":
-        return AttackEffect(
-            amount=effect_dict["value"]
-        )
-    elif effect_type == "x_attack":
-        return XAttackEffect(
-            damage_per_hit=effect_dict["value"]
-        )
-    elif effect_type == "block":
-        return BlockEffect(
-            amount=effect_dict["value"]
-        )
-    elif effect_type == "buff":
-        return BuffEffect(
-            name=effect_dict["name"],
-            value=effect_dict["value"],
-            duration=effect_dict.get("duration",None)
-            #target_self=effect_dict.get("target_self", True)
-        )
-    elif effect_type == "debuff":
-        return DebuffEffect(
-            name=effect_dict["name"],
-            duration=effect_dict["duration"],
-            value=effect_dict.get("value",None)
-            #target_user=effect_dict.get("target_user", False)
-        )
-    elif effect_type == "draw":
-        return DrawEffect(
-            amount=effect_dict["value"]
-        )
-    elif effect_type == "energy":
-        return EnergyEffect(
-            amount=effect_dict["value"]
-        )
-    elif effect_type == "hp":
-        return HPEffect(
-            amount=effect_dict["value"]
-        )
-    elif effect_type == "reaper":
-        return ReaperAttackEffect(
-            ratio=effect_dict.get("ratio", 1),
-            attack=effect_dict.get("attack", 1)
-        )
-    elif effect_type == "power":
-        return PowerEffect(
-            name=effect_dict["name"],
-            value=effect_dict.get("value", 1)
-        )
-    elif effect_type =="double_block":
-        return DoubleBlockEffect()
-    elif effect_type =="double_strength":
-        return DoubleStrengthEffect()
-    elif effect_type == "exhaust_by_type":
-        return ExhaustByTypeEffect(
-            block_per_card=effect_dict.get("block_per_card", 0),
-            attack_per_card=effect_dict.get("attack_per_card", 0),
-            exclude_types=effect_dict.get("exclude_types", []),
-            include_types=effect_dict.get("include_types")
-        )
-    elif effect_type == "status":
-        return StatusEffect(
-            name=effect_dict["name"],
-            temporary=effect_dict.get("temporary", True)
-        )
-    elif effect_type == "generate_card":
-        return GenerateCardEffect(
-            card_id=effect_dict["card_id"],
-            amount=effect_dict.get("amount", 1),
-            destination=effect_dict.get("destination", "hand")
-        )
-    elif effect_type == "block_attack":
-        return BlockBasedAttack()
-    else:
+    parser = _EFFECT_PARSERS.get(effect_type)
+    if parser is None:
         raise ValueError(f"Unknown effect type: {effect_type}")
+    return parser(effect_dict)
 
 
 def parse_intent(intent_dict):
     intent_type = intent_dict["type"]
-
-    if intent_type == "attack":
-        return AttackIntent(amount=intent_dict["value"])
-    elif intent_type == "block":
-        return BlockIntent(
-            amount=intent_dict["value"],
-            target_selector=intent_dict.get("target_selector", "self")
-            )
-    elif intent_type == "buff":
-        return BuffIntent(
-            name=intent_dict["name"],
-            target_selector=intent_dict.get("target_selector", "self"),
-            value=intent_dict["value"],
-            duration=intent_dict.get("duration", None)
-        )
-    elif intent_type == "debuff":
-        return DebuffIntent(
-            name=intent_dict["name"],
-            duration=intent_dict["duration"],
-            value=intent_dict.get("value",None)
-        )
-    elif intent_type == "heal":
-        return HealIntent(
-            amount=intent_dict["value"],
-            target_selector=intent_dict.get("target_selector", "self")
-        )
-    elif intent_type == "insert_card":
-        return InsertCardIntent(
-            card_id=intent_dict["card_id"],
-            amount=intent_dict.get("amount", 1),
-            destination=intent_dict.get("destination", "discard")
-        )
-    elif intent_type == "spawn":
-        return SpawnIntent(
-            threshold=intent_dict["threshold"],
-            summon_enemy_id=intent_dict["summon_enemy_id"],
-            amount=intent_dict.get("amount",2)
-        )
+    parser = _INTENT_PARSERS.get(intent_type)
+    if parser is None:
+        raise ValueError(f"Unknown intent type: {intent_type}")
+    return parser(intent_dict)
 
 
-def load_card_pool(filename="card.json"):
+def _data_path(filename):
     base_dir = os.path.dirname(os.path.dirname(__file__))  # DeckBuilderGym/
-    file_path = os.path.join(base_dir, "data", filename)
+    return os.path.join(base_dir, "data", filename)
+
+
+def _load_json(file_path):
     with open(file_path, "r", encoding="utf-8") as f:
         return json.load(f)
 
 
+def _card_template(card_def):
+    effects = tuple(parse_effect(eff) for eff in card_def["effects"])
+    return MappingProxyType({
+        "id": card_def["id"],
+        "name": card_def["name"],
+        "rarity": card_def.get("rarity",None),
+        "cost": card_def["cost"],
+        "target_selector": card_def["target_selector"],
+        "effects": effects,
+        "ops": compile_effects(effects),
+        "card_type": card_def["card_type"],
+        "playable": card_def.get("playable", True),
+        "ethereal": card_def.get("ethereal", False),
+        "exhaust": card_def.get("exhaust", False),
+        "innate": card_def.get("innate", False),
+        "retain": card_def.get("retain", False),
+        "shuffle_back": card_def.get("shuffle_back", False)
+    })
+
+
+def _enemy_template(entry):
+    intent_sq_parsed = []
+    for turn_intents in entry.get("intent_sq", []):
+        if isinstance(turn_intents, dict):      # single-intent turn written without the list
+            turn_intents = [turn_intents]
+        intent_sq_parsed.append(tuple(parse_intent(intent) for intent in turn_intents))
+
+    return MappingProxyType({
+        "id": entry["id"],
+        "name": entry["name"],
+        "hp": entry["hp"],
+        "max_hp": entry["hp"],
+        "block": entry.get("block",0),
+        "buffs": entry.get("buffs", {}),
+        "debuffs": entry.get("debuffs", {}),
+        "intent_sq": tuple(intent_sq_parsed),
+        "tags": entry.get("tags", None),
+        "die_after_turn": entry.get("die_after_turn", None)
+    })
+
+
+class ContentRegistry:
+    def __init__(self, card_pool, enemies=None, decks=None, enemy_groups=None):
+        self.card_pool = card_pool
+        self.decks = decks or {}
+        self.enemy_groups = enemy_groups or {}
+        # effects and intents are parsed once here; instances share them since they hold no battle state
+        self._card_templates = {c["id"]: _card_template(c) for c in card_pool}
+        self._enemy_templates = {e["id"]: _enemy_template(e) for e in enemies or []}
+
+    @classmethod
+    def from_files(cls, card_path=None, enemy_path=None, deck_path=None, group_path=None):
+        return cls(
+            card_pool=_load_json(card_path or _data_path("card.json")),
+            enemies=_load_json(enemy_path or _data_path("enemy.json")),
+            decks=_load_json(deck_path or _data_path("deck.json")),
+            enemy_groups=_load_json(group_path or _data_path("enemy_group.json"))
+        )
+
+    def card(self, card_id):
+        template = self._card_templates.get(card_id)
+        if template is None:
+            raise ValueError(f"Card ID {card_id} not found")
+        return Card(**template)
+
+    def cards(self, card_ids):
+        return [self.card(cid) for cid in card_ids]
+
+    def enemy(self, enemy_id):
+        template = self._enemy_templates.get(enemy_id)
+        if template is None:
+            raise ValueError(f"[Loader Error] Enemy with id '{enemy_id}' not found.")
+        # Enemy copies the template's status entries into its own StatusBlock
+        return Enemy(**template)
+
+    def deck(self, deck_id):
+        if deck_id not in self.decks:
+            raise ValueError(f"[Loader Error] Deck with id '{deck_id}' not found.")
+        entry = self.decks[deck_id]
+        return self.cards(entry["cards"]), entry["name"]
+
+    def enemy_group(self, group_id):
+        if group_id not in self.enemy_groups:
+            raise ValueError(f"[Loader Error] Enemy group with id '{group_id}' not found.")
+        entry = self.enemy_groups[group_id]
+        return [self.enemy(eid) for eid in entry["enemy_ids"]], entry["name"]
+
+
+_registries = {}
+
+
+def get_registry(card_path=None, enemy_path=None, deck_path=None, group_path=None):
+    paths = tuple(os.path.abspath(p or _data_path(default)) for p, default in (
+        (card_path, "card.json"),
+        (enemy_path, "enemy.json"),
+        (deck_path, "deck.json"),
+        (group_path, "enemy_group.json")
+    ))
+    registry = _registries.get(paths)
+    if registry is None:
+        registry = _registries[paths] = ContentRegistry.from_files(*paths)
+    return registry
+
+
+# legacy loaders take a raw card pool list, keep one registry per pool object
+_pool_registries = {}
+
+
+def _registry_for_pool(card_pool):
+    cached = _pool_registries.get(id(card_pool))
+    if cached is None or cached[0] is not card_pool or cached[1] != len(card_pool):
+        cached = _pool_registries[id(card_pool)] = (card_pool, len(card_pool), ContentRegistry(card_pool))
+    return cached[2]
+
+
+def load_card_pool(filename="card.json"):
+    return _load_json(_data_path(filename))
+
+
 def load_card_by_id(card_pool, card_id):
-    for card_def in card_pool:
-        if card_def["id"] == card_id:
-            effects = [parse_effect(eff) for eff in card_def["effects"]]
-            return Card(
-                id=card_def["id"],
-                name=card_def["name"],
-                rarity=card_def.get("rarity",None),
-                cost=card_def["cost"],
-                target_selector=card_def["target_selector"],
-                effects=effects,
-                card_type=card_def["card_type"],
-                playable=card_def.get("playable", True),
-                ethereal=card_def.get("ethereal", False),
-                exhaust=card_def.get("exhaust", False),
-                innate=card_def.get("innate", False),
-                retain=card_def.get("retain", False),
-                shuffle_back=card_def.get("shuffle_back", False)
-            )
-    raise ValueError(f"Card ID {card_id} not found")
+    return _registry_for_pool(card_pool).card(card_id)
 
 
 def generate_reward_choices(card_pool, num_choices=3):
@@ -168,45 +258,18 @@ def build_starting_deck(card_pool):
 
 def load_enemy_by_id(enemy_id: str, json_path="data/enemy.json") -> Enemy:
     base_dir = os.path.dirname(os.path.dirname(__file__))
-    file_path = os.path.join(base_dir, json_path)
-    with open(file_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
-    
-    for entry in data:
-        if entry["id"] == enemy_id:
-            intent_sq_raw = entry.get("intent_sq", [])
-            intent_sq_parsed = []
-            for turn_intents in intent_sq_raw:
-                parsed_turn = [parse_intent(intent) for intent in turn_intents]
-                intent_sq_parsed.append(parsed_turn)
-
-            return Enemy(
-                id=entry["id"],
-                name=entry["name"],
-                hp=entry["hp"],
-                max_hp=entry["hp"],
-                block=entry.get("block",0),
-                buffs=entry.get("buffs", {}),
-                debuffs=entry.get("debuffs", {}),
-                intent_sq=intent_sq_parsed,
-                tags = entry.get("tags", None),
-                die_after_turn=entry.get("die_after_turn", None)
-            )
-    
-    raise ValueError(f"[Loader Error] Enemy with id '{enemy_id}' not found.")
+    return get_registry(enemy_path=os.path.join(base_dir, json_path)).enemy(enemy_id)
 
 
 def load_deck_by_id(deck_json_path, deck_id, card_pool):
-    with open(deck_json_path, "r") as f:
-        deck_data = json.load(f)
+    deck_data = _load_json(deck_json_path)
     entry = deck_data[deck_id]
-    return [load_card_by_id(card_pool, cid) for cid in entry["cards"]], entry["name"]
+    return _registry_for_pool(card_pool).cards(entry["cards"]), entry["name"]
 
 
 def load_enemy_group(group_path, group_id):
-    with open(group_path, "r") as f:
-        group_data = json.load(f)
+    group_data = _load_json(group_path)
     enemy_ids = group_data[group_id]["enemy_ids"]
-    enemy_objs = [load_enemy_by_id(eid) for eid in enemy_ids]
+    registry = get_registry()
+    enemy_objs = [registry.enemy(eid) for eid in enemy_ids]
     return enemy_objs, group_data[group_id]["name"]
-
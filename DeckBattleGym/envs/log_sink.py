@@ -0,0 +1,97 @@
+import os
+import re
+
+
+class NullLogSink:
+    def write(self, battle_id, lines):
+        return None
+
+    def close(self):
+        pass
+
+
+class MemoryLogSink:
+    def __init__(self):
+        self.logs = {}
+
+    def write(self, battle_id, lines):
+        self.logs[battle_id] = list(lines)
+        return battle_id
+
+    def close(self):
+        pass
+
+
+class RotatingFileLogSink:
+    def __init__(self, directory=".", prefix="battle_log_", max_files=None):
+        self.directory = directory
+        self.prefix = prefix
+        self.max_files = max_files
+        self._next_number = None
+        self._written = []
+
+    def _next_filename(self):
+        if self._next_number is None:
+            # one directory listing, and only once a log is actually written
+            pattern = re.compile(rf"{re.escape(self.prefix)}(\d+)\.txt$")
+            numbers = [int(m.group(1)) for m in map(pattern.match, os.listdir(self.directory)) if m]
+            self._next_number = max(numbers, default=0) + 1
+        filename = os.path.join(self.directory, f"{self.prefix}{self._next_number}.txt")
+        self._next_number += 1
+        return filename
+
+    def write(self, battle_id, lines):
+        # "x" never overwrites: a number taken since the directory was listed (e.g. by another
+        # process) is skipped
+        while True:
+            filename = self._next_filename()
+            try:
+                f = open(filename, "x", encoding="utf-8")
+            except FileExistsError:
+                continue
+            break
+        with f:
+            for entry in lines:
+                f.write(entry + "\n")
+        if self.max_files is not None:
+            self._written.append(filename)
+            while len(self._written) > self.max_files:
+                os.remove(self._written.pop(0))
+        return filename
+
+    def close(self):
+        pass
+
+
+# per process and directory, see shared_file_sink
+_shared_sinks = {}
+
+
+def shared_file_sink(directory="."):
+    # the RotatingFileLogSink logged Battles use by default: one per process and directory, so building
+    # a Battle per logged battle doesn't list the directory again each time
+    key = (os.getpid(), os.path.abspath(directory))
+    sink = _shared_sinks.get(key)
+    if sink is None:
+        sink = _shared_sinks[key] = RotatingFileLogSink(directory)
+    return sink
+
+
+class MultiplexFileLogSink:
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self._file = None
+
+    def write(self, battle_id, lines):
+        if self._file is None:
+            self._file = open(self.filepath, "a", encoding="utf-8")
+        for entry in lines:
+            for line in entry.split("\n"):
+                self._file.write(f"{battle_id}\t{line}\n")
+        self._file.flush()
+        return self.filepath
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,140 @@
+import numpy as np
+from DeckBattleGym.envs.battle import PILES
+from DeckBattleGym.envs.status import STATUS_INDEX, NUM_BUILTIN_STATUSES
+
+
+# Fixed-size float32 view of a battle. The per-pile card count vectors are the expensive part to
+# rebuild, so they are kept up to date from the battle's pile notifications (Battle.pile_listener);
+# the few player, enemy, status and intent numbers are copied on every encode().
+#
+# layout, in order:
+#   piles    len(PILES) x cards in the pool: how many copies of each card are in draw, hand,
+#            discard, exhaust and played powers
+#   hand     hand_limit slots: card pool index + 1 of the card in that hand slot, 0 when empty
+#   player   hp, max hp, block, energy, turn
+#   player statuses, one slot per built-in status (STATUS_NAMES order): its value, or duration when it has none
+#   enemies  max_enemies x (hp, max hp, block, alive, statuses, next intent): the next intent is
+#            the summed amount per intent type (1 for intents without an amount)
+
+
+# intent columns, in order. Fixed here so the layout never depends on which classes happen to be
+# defined; pass intent_types to give intents added with register_intent_type their own columns, and
+# status_slots to cover statuses beyond the built-in ones
+INTENT_TYPES = ("AttackIntent", "BlockIntent", "BuffIntent", "DebuffIntent", "HealIntent", "InsertCardIntent",
+                "SpawnIntent")
+
+
+class ObservationEncoder:
+    def __init__(self, registry, max_enemies=8, hand_limit=10, status_slots=None, intent_types=None):
+        self.card_index = {card["id"]: i for i, card in enumerate(registry.card_pool)}
+        self.num_cards = len(self.card_index)
+        self.max_enemies = max_enemies
+        self.hand_limit = hand_limit
+        self.status_slots = NUM_BUILTIN_STATUSES if status_slots is None else status_slots
+        self.intent_types = tuple(INTENT_TYPES if intent_types is None else intent_types)
+        self.intent_slot = {name: i for i, name in enumerate(self.intent_types)}
+        self.pile_row = {name: row for row, name in enumerate(PILES)}
+
+        sizes = (("piles", len(PILES) * self.num_cards),
+                 ("hand", hand_limit),
+                 ("player", 5),
+                 ("player_status", self.status_slots),
+                 ("enemies", max_enemies * self.enemy_size))
+        self.sections, start = {}, 0
+        for name, size in sizes:
+            self.sections[name] = slice(start, start + size)
+            start += size
+        self.size = start
+
+        self.counts = np.zeros((len(PILES), self.num_cards), dtype=np.float32)
+        self.battle = None
+
+    @property
+    def enemy_size(self):
+        return 4 + self.status_slots + len(self.intent_types)
+
+    # ---- pile notifications from Battle ----
+
+    def attach(self, battle):
+        battle.pile_listener = self
+        self.battle = battle
+        self.piles_reset(battle)
+        return self
+
+    def detach(self):
+        if self.battle is not None and self.battle.pile_listener is self:
+            self.battle.pile_listener = None
+        self.battle = None
+
+    def card_moved(self, card, src, dst):
+        index = self.card_index.get(card.id)
+        if index is None:
+            return
+        if src is not None:
+            self.counts[self.pile_row[src], index] -= 1
+        if dst is not None:
+            self.counts[self.pile_row[dst], index] += 1
+
+    def pile_moved(self, src, dst):
+        # a whole pile was moved, e.g. discard shuffled back into the draw pile
+        self.counts[self.pile_row[dst]] += self.counts[self.pile_row[src]]
+        self.counts[self.pile_row[src]] = 0
+
+    def piles_reset(self, battle):
+        # full recount, after reset() or when the piles were replaced wholesale
+        self.counts[:] = 0
+        card_index = self.card_index
+        for row, name in enumerate(PILES):
+            counts = self.counts[row]
+            for card in getattr(battle, name):
+                index = card_index.get(card.id)
+                if index is not None:
+                    counts[index] += 1
+
+    # ---- encoding ----
+
+    def _write_statuses(self, out, start, entity):
+        for view in (entity.buffs, entity.debuffs):
+            for name, entry in view.items():
+                slot = STATUS_INDEX.get(name)
+                if slot is None or slot >= self.status_slots:
+                    continue
+                value = entry.get("value")
+                if value is None:
+                    value = entry.get("duration", 1)
+                out[start + slot] = value if value is not None else 1
+
+    def encode(self, out=None):
+        # writes into out (a float32 array of self.size, e.g. a row of a shared buffer) or a new array
+        battle = self.battle
+        if out is None:
+            out = np.empty(self.size, dtype=np.float32)
+        sections = self.sections
+        out[sections["piles"]] = self.counts.ravel()
+
+        hand = sections["hand"]
+        out[hand] = 0
+        card_index = self.card_index
+        for slot, card in enumerate(battle.hand[:self.hand_limit]):
+            out[hand.start + slot] = card_index.get(card.id, -1) + 1
+
+        player = battle.player
+        out[sections["player"]] = (player.hp, player.max_hp, player.block, player.energy, battle.turn)
+        out[sections["player_status"]] = 0
+        self._write_statuses(out, sections["player_status"].start, player)
+
+        enemies = sections["enemies"]
+        out[enemies] = 0
+        intents_start = 4 + self.status_slots
+        intent_slot = self.intent_slot
+        for k, enemy in enumerate(battle.enemies[:self.max_enemies]):
+            base = enemies.start + k * self.enemy_size
+            alive = enemy.hp > 0
+            out[base:base + 4] = (max(enemy.hp, 0), enemy.max_hp, enemy.block, 1.0 if alive else 0.0)
+            self._write_statuses(out, base + 4, enemy)
+            if alive and enemy.intent_sq:
+                for intent in enemy.intent_sq[enemy.intent_index % len(enemy.intent_sq)]:
+                    slot = intent_slot.get(type(intent).__name__)
+                    if slot is not None:
+                        out[base + intents_start + slot] += getattr(intent, "amount", 1)
+        return out
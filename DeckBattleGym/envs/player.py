@@ -1,7 +1,16 @@
+import copy
+import random
 from DeckBattleGym.envs.player_strategy import SimpleStrategy
 from DeckBattleGym.envs.buff_n_debuff import apply_regen, apply_strength_gain, tick_poison, tick_standard_duration
+from DeckBattleGym.envs.utils import copy_entries
+from DeckBattleGym.envs.status import StatusBlock
+from DeckBattleGym.envs.powers import power_hooks
+from DeckBattleGym.envs.battle_log import LOSE_STRENGTH, END_BLOCK, ENTANGLED, SKIP
 
 class Player:
+    __slots__ = ("name", "hp", "id", "max_hp", "energy", "max_energy", "status", "buffs", "debuffs", "powers",
+                 "hooks", "status_flags", "strategy", "block", "initial_state")
+
     def __init__(self, name, hp, energy, 
                  id="p",
                  max_hp=None, 
@@ -16,25 +25,68 @@ class Player:
         self.max_hp = max_hp or hp
         self.energy = energy
         self.max_energy = max_energy
-        self.buffs = buffs or {}
-        self.debuffs = debuffs or {}
+        # buffs/debuffs are the dict-like halves of the StatusBlock, replace their contents rather than the objects
+        self.status = StatusBlock(buffs, debuffs)
+        self.buffs = self.status.buffs
+        self.debuffs = self.status.debuffs
         self.powers = powers or {}
-        #self.status_flags = {}
+        # power subscriptions per event, rebuilt whenever the set of powers changes (use add_power)
+        self.hooks = power_hooks(self.powers)
+        self.status_flags = None
         self.strategy = strategy or SimpleStrategy()
         self.block = 0
+        self.initial_state = (hp, energy, copy_entries(self.buffs), copy_entries(self.debuffs), dict(self.powers))
+
+    def reset(self):
+        hp, energy, buffs, debuffs, powers = self.initial_state
+        self.hp = hp
+        self.energy = energy
+        self.block = 0
+        self.buffs.replace(buffs)
+        self.debuffs.replace(debuffs)
+        self.powers = dict(powers)
+        self.hooks = power_hooks(self.powers)
+        self.status_flags = None
+
+    # Battle.snapshot/restore/fork; buffs, debuffs and powers are copied, everything else is immutable
+    def snapshot(self):
+        flags = None if self.status_flags is None else dict(self.status_flags)
+        return (self.hp, self.block, self.energy, copy_entries(self.buffs), copy_entries(self.debuffs),
+                dict(self.powers), self.hooks, flags)
+
+    def restore(self, state):
+        self.hp, self.block, self.energy, buffs, debuffs, powers, self.hooks, flags = state
+        self.buffs.replace(buffs)
+        self.debuffs.replace(debuffs)
+        self.powers = dict(powers)
+        self.status_flags = None if flags is None else dict(flags)
+
+    def fork(self):
+        # an independent copy; the strategy is copied too, with its own rng at the same state
+        clone = copy.copy(self)
+        clone.status = StatusBlock(self.buffs, self.debuffs)
+        clone.buffs = clone.status.buffs
+        clone.debuffs = clone.status.debuffs
+        clone.powers = dict(self.powers)
+        if self.status_flags is not None:
+            clone.status_flags = dict(self.status_flags)
+        clone.strategy = copy.copy(self.strategy)
+        rng = getattr(self.strategy, "rng", None)
+        if rng is not None:
+            clone.strategy.rng = random.Random()
+            clone.strategy.rng.setstate(rng.getstate())
+        return clone
     
     def begin_turn(self, battle=None):
-        if not self.has_power("Barricade"):
+        if not self.hooks.retain_block:
             self.block = 0
         self.energy = self.max_energy
         self.tick_buffs_and_debuffs()
         self.trigger_begin_turn_powers(battle)
 
     def trigger_begin_turn_powers(self, battle):
-        if "Brutality" in self.powers:
-            value = self.powers["Brutality"]
-            self.take_damage(value, source="self")
-            battle.draw_cards(value)
+        for name, action, _ in self.hooks.on_turn_start:
+            action(self, battle, self.powers[name])
 
     def end_turn(self, battle=None):
         if "LoseStrength" in self.debuffs:
@@ -42,56 +94,30 @@ class Player:
             if "Strength" in self.buffs:
                 self.buffs["Strength"]["value"] = self.buffs["Strength"]["value"] - amount
                 if battle is not None and battle.if_battle_log:
-                    battle.log.append(f"[EndTurn] {self.name} loses {amount} Strength.")
+                    battle.log.append((LOSE_STRENGTH, self.name, amount))
             del self.debuffs["LoseStrength"]
         if "NoDraw" in self.debuffs:
             del self.debuffs["NoDraw"]
         if battle is not None and battle.if_battle_log:
-            battle.log.append(f"[EndTurn] Player has {self.block} Block")
+            battle.log.append((END_BLOCK, self.block))
 
     def take_damage(self, amount, source="enemy"):
         damage = max(0, amount - self.block)
         self.hp -= damage
         self.block = max(0, self.block - amount)
 
-        if source == "self" and "Rupture" in self.powers:
-            strength_gain = self.powers["Rupture"]
-
-            if "Strength" not in self.buffs:
-                self.buffs["Strength"] = {"value": 0}
-
-            self.buffs["Strength"]["value"] += strength_gain
+        if source == "self":
+            for name, action, _ in self.hooks.on_self_damage:
+                action(self, None, self.powers[name])
 
     def gain_block(self, amount):
         self.block += amount
     
     def apply_buff(self, name, value, duration=None):
-        if name not in self.buffs:
-            self.buffs[name] = {"value": 0}
-
-        self.buffs[name]["value"] += value
-
-        if duration is not None:
-            if "duration" in self.buffs[name]:
-                self.buffs[name]["duration"] += duration
-            else:
-                self.buffs[name]["duration"] = duration
+        self.status.apply_buff(name, value, duration)
 
     def apply_debuff(self, name, duration, value=None):
-        if "Artifact" in self.buffs and self.buffs["Artifact"]["value"] > 0:
-            self.buffs["Artifact"]["value"] -= 1
-            return
-        
-        if name not in self.debuffs:
-            self.debuffs[name] = {"duration": 0}
-
-        self.debuffs[name]["duration"] += duration
-
-        if value is not None:
-            if "value" in self.debuffs[name]:
-                self.debuffs[name]["value"] += value
-            else:
-                self.debuffs[name]["value"] = value
+        self.status.apply_debuff(name, duration, value)
 
     def gain_energy(self, amount):
         self.energy+=amount
@@ -101,14 +127,18 @@ class Player:
     
     def has_power(self, name):
         return name in self.powers
+
+    def add_power(self, name, value):
+        if name in self.powers:
+            self.powers[name] += value
+        else:
+            self.powers[name] = value
+            self.hooks = power_hooks(self.powers)
     
-    def trigger_on_exhaust(self, battle=None):
-        if self.has_power("GainBlockOnExhaust"):
-            block_per_exhaust = self.powers["GainBlockOnExhaust"]
-            self.block += block_per_exhaust
-        if self.has_power("DrawOnExhaust"):
-            draw_per_exhaust = self.powers["DrawOnExhaust"]
-            battle.draw_cards(draw_per_exhaust)
+    def trigger_on_exhaust(self, battle=None, card=None):
+        for name, action, card_types in self.hooks.on_exhaust:
+            if card_types is None or (card is not None and card.card_type in card_types):
+                action(self, battle, self.powers[name])
 
     def tick_buffs_and_debuffs(self):
         # Buffs
@@ -133,39 +163,28 @@ class Player:
                 del self.debuffs[name]
 
     def after_draw_card(self, card, battle=None):
-        if "Evolve" in self.powers:
-            trigger_types = {"status", "curse"}
-            if card.card_type in trigger_types:
-                amount = self.powers["Evolve"]
-                if battle:
-                    battle.draw_cards(amount)
-        if "FireBreath" in self.powers:
-            trigger_types = {"status", "curse"}
-            if card.card_type in trigger_types:
-                amount = self.powers["FireBreath"]
-                if battle:
-                    for enemy in battle.enemies:
-                        if enemy.hp > 0:
-                            enemy.take_damage(amount)
+        for name, action, card_types in self.hooks.on_draw:
+            if card_types is None or card.card_type in card_types:
+                action(self, battle, self.powers[name])
 
     def play_cards(self, hand, enemies, battle):
         while True:
             if "Entangled" in self.buffs:
                 playable_cards = [card for card in hand if card.card_type != "attack" and getattr(card, "playable", True)]
                 if battle.if_battle_log:
-                    battle.log.append("[Entangled] Not allowed to play attack cards")
+                    battle.log.append((ENTANGLED,))
             else:
                 playable_cards = [card for card in hand if getattr(card, "playable", True)]
             if not playable_cards:
                 if battle.if_battle_log:
-                    battle.log.append("[Skip] No playable cards this turn.")
+                    battle.log.append((SKIP, None))
                 return
             card = self.strategy.select_card(playable_cards, self, enemies, battle)
             if card is None:
                 break
             if not getattr(card, "playable", True):
                 if battle.if_battle_log:
-                    battle.log.append(f"[Skip] {card.name} is not playable.")
+                    battle.log.append((SKIP, card))
                 continue
 
             targets = self.strategy.select_target(card, self, enemies, battle)
@@ -1,6 +1,9 @@
 import random
 
 class SimpleStrategy:
+    def __init__(self, rng=None, seed=None):
+        self.rng = rng if rng is not None else random.Random(seed)
+
     def select_card(self, hand, player, enemies, battle):
         for card in hand:
             if card.cost == "x":
@@ -16,7 +19,7 @@ class SimpleStrategy:
         if sel == "all_enemies":
             return alive
         elif sel == "random_enemy":
-            return [random.choice(alive)] if alive else []
+            return [self.rng.choice(alive)] if alive else []
         elif sel == "lowest_hp":
             return [min(alive, key=lambda e: e.hp)] if alive else []
         elif sel == "single_enemy":
@@ -28,6 +31,9 @@ class SimpleStrategy:
             raise ValueError(f"Unknown target_selector: {sel}")
         
 class RandomStrategy:
+    def __init__(self, rng=None, seed=None):
+        self.rng = rng if rng is not None else random.Random(seed)
+
     def select_card(self, hand, player, enemies, battle):
         can_play = []
         for card in hand:
@@ -35,7 +41,7 @@ class RandomStrategy:
                 can_play.append(card)
             elif isinstance(card.cost, (int, float)) and card.cost <= player.energy:
                 can_play.append(card)
-        return random.choice(can_play) if can_play else None
+        return self.rng.choice(can_play) if can_play else None
 
     def select_target(self, card, player, enemies, battle):
         sel = card.target_selector
@@ -44,11 +50,11 @@ class RandomStrategy:
         if sel == "all_enemies":
             return alive
         elif sel == "random_enemy":
-            return [random.choice(alive)] if alive else []
+            return [self.rng.choice(alive)] if alive else []
         elif sel == "lowest_hp":
             return [min(alive, key=lambda e: e.hp)] if alive else []
         elif sel == "single_enemy":
-            return [random.choice(alive)] if alive else []
+            return [self.rng.choice(alive)] if alive else []
         elif sel == "self":
             return [player]
         else:
@@ -0,0 +1,124 @@
+import os
+import json
+
+
+# Powers subscribe to player events from data/power.json instead of being polled by name.
+# Each trigger names an event, an action from _POWER_ACTIONS and optionally the card types it
+# reacts to; the action gets the power's current stack count. Hooks fire in file order.
+
+POWER_EVENTS = ("on_draw", "on_exhaust", "on_self_damage", "on_turn_start")
+POWER_FLAGS = ("retain_block",)
+
+
+def _draw(player, battle, amount):
+    if battle is not None:
+        battle.draw_cards(amount)
+
+
+def _damage_all_enemies(player, battle, amount):
+    if battle is not None:
+        for enemy in battle.enemies:
+            if enemy.hp > 0:
+                enemy.take_damage(amount)
+
+
+def _gain_strength(player, battle, amount):
+    player.buffs.add_value("Strength", amount)
+
+
+def _gain_block(player, battle, amount):
+    player.block += amount
+
+
+def _self_damage(player, battle, amount):
+    player.take_damage(amount, source="self")
+
+
+# action name -> fn(player, battle, amount); keys are the "action" field of power.json
+_POWER_ACTIONS = {
+    "draw": _draw,
+    "damage_all_enemies": _damage_all_enemies,
+    "gain_strength": _gain_strength,
+    "gain_block": _gain_block,
+    "self_damage": _self_damage,
+}
+
+# power name -> {"triggers": [...], "flags": [...]}, filled from data/power.json on first use
+_POWER_DEFS = {}
+_hook_cache = {}
+# set once data/power.json is in _POWER_DEFS; registered powers may add to or override it
+_defaults_loaded = False
+
+
+def _load_defaults():
+    global _defaults_loaded
+    if not _defaults_loaded:
+        _defaults_loaded = True
+        load_powers()
+
+
+def register_power_action(action, fn):
+    _POWER_ACTIONS[action] = fn
+    _hook_cache.clear()
+
+
+def register_power(name, definition):
+    # the shipped powers go in first, so a custom one with the same name overrides them
+    _load_defaults()
+    for trigger in definition.get("triggers", ()):
+        if trigger["event"] not in POWER_EVENTS:
+            raise ValueError(f"[Power Error] Unknown event '{trigger['event']}' for power '{name}'.")
+        if trigger["action"] not in _POWER_ACTIONS:
+            raise ValueError(f"[Power Error] Unknown action '{trigger['action']}' for power '{name}'.")
+    for flag in definition.get("flags", ()):
+        if flag not in POWER_FLAGS:
+            raise ValueError(f"[Power Error] Unknown flag '{flag}' for power '{name}'.")
+    _POWER_DEFS[name] = definition
+    _hook_cache.clear()
+
+
+def load_powers(path=None):
+    if path is None:
+        path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "power.json")
+    with open(path, "r", encoding="utf-8") as f:
+        for name, definition in json.load(f).items():
+            register_power(name, definition)
+
+
+class PowerHooks:
+    # per event, a tuple of (power name, action, card types or None); events nobody listens to stay ()
+    __slots__ = POWER_EVENTS + POWER_FLAGS
+
+    def __init__(self):
+        for event in POWER_EVENTS:
+            setattr(self, event, ())
+        for flag in POWER_FLAGS:
+            setattr(self, flag, False)
+
+
+NO_HOOKS = PowerHooks()
+
+
+def power_hooks(powers):
+    # hooks only depend on which powers are active, stack counts are read when they fire
+    if not powers:
+        return NO_HOOKS
+    _load_defaults()
+    key = frozenset(powers)
+    hooks = _hook_cache.get(key)
+    if hooks is None:
+        hooks = PowerHooks()
+        subscribers = {event: [] for event in POWER_EVENTS}
+        for name, definition in _POWER_DEFS.items():
+            if name not in powers:
+                continue
+            for trigger in definition.get("triggers", ()):
+                card_types = trigger.get("card_types")
+                subscribers[trigger["event"]].append(
+                    (name, _POWER_ACTIONS[trigger["action"]], frozenset(card_types) if card_types else None))
+            for flag in definition.get("flags", ()):
+                setattr(hooks, flag, True)
+        for event, entries in subscribers.items():
+            setattr(hooks, event, tuple(entries))
+        hooks = _hook_cache[key] = hooks
+    return hooks
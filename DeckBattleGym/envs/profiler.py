@@ -0,0 +1,71 @@
+class BattleProfiler:
+    # Opt-in timing for Battle.run: wall time and call counts per phase, per card id and per enemy
+    # intent type. Pass one to Battle(profiler=...) and it accumulates over every battle it sees;
+    # profilers from other battles or worker processes are combined with merge().
+    # Nested timings are inclusive: draw_cards and play_card are also counted inside player_turn.
+
+    def __init__(self):
+        self.battles = 0
+        # name -> [calls, seconds]
+        self.phases = {}
+        self.cards = {}
+        self.intents = {}
+
+    @staticmethod
+    def _add(table, key, seconds):
+        entry = table.get(key)
+        if entry is None:
+            table[key] = [1, seconds]
+        else:
+            entry[0] += 1
+            entry[1] += seconds
+
+    def add_phase(self, name, seconds):
+        self._add(self.phases, name, seconds)
+
+    def add_card(self, card_id, seconds):
+        self._add(self.cards, card_id, seconds)
+
+    def add_intent(self, intent_type, seconds):
+        self._add(self.intents, intent_type, seconds)
+
+    def merge(self, other):
+        # other may be a BattleProfiler or its to_dict(), as returned from worker processes
+        if isinstance(other, dict):
+            other = BattleProfiler.from_dict(other)
+        self.battles += other.battles
+        for name in ("phases", "cards", "intents"):
+            table = getattr(self, name)
+            for key, (calls, seconds) in getattr(other, name).items():
+                entry = table.setdefault(key, [0, 0.0])
+                entry[0] += calls
+                entry[1] += seconds
+        return self
+
+    def to_dict(self):
+        def rows(table):
+            return {key: {"calls": calls, "seconds": seconds} for key, (calls, seconds) in table.items()}
+        return {
+            "battles": self.battles,
+            "phases": rows(self.phases),
+            "cards": rows(self.cards),
+            "intents": rows(self.intents)
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        profiler = cls()
+        profiler.battles = data.get("battles", 0)
+        for name in ("phases", "cards", "intents"):
+            setattr(profiler, name, {key: [row["calls"], row["seconds"]] for key, row in data.get(name, {}).items()})
+        return profiler
+
+    def report(self, limit=10):
+        lines = [f"[Profile] {self.battles} battles"]
+        sections = (("phase", self.phases, None), ("card", self.cards, limit), ("intent", self.intents, limit))
+        for title, table, top in sections:
+            entries = sorted(table.items(), key=lambda item: item[1][1], reverse=True)[:top]
+            for key, (calls, seconds) in entries:
+                per_call = seconds / calls * 1e6 if calls else 0.0
+                lines.append(f"  {title:<7}{str(key):<22}{calls:>10} calls {seconds:>9.3f}s {per_call:>9.2f}us/call")
+        return "\n".join(lines)
@@ -0,0 +1,187 @@
+# Buffs and debuffs of one entity. entity.buffs / entity.debuffs keep the old dict-of-dicts
+# interface ("Weak" in debuffs, buffs["Strength"]["value"] += 2, copy_entries(buffs), printing)
+# and reads stay plain dict lookups. Adding or removing a status, through any dict method, also fills
+# an integer-indexed slot table and drops the cached damage/block modifiers EffectCalculator uses on
+# every hit.
+from DeckBattleGym.envs.utils import copy_entries
+
+
+STATUS_NAMES = [
+    "Strength", "Dexterity", "Weak", "Vulnerable", "Frail", "Intangible", "Artifact",
+    "Poison", "Regen", "Barricade", "Entangled", "NoDraw", "LoseStrength", "StrengthGain",
+    "GainStrength", "Split",
+]
+STATUS_INDEX = {name: i for i, name in enumerate(STATUS_NAMES)}
+# the statuses above, before status_index() appends any others
+NUM_BUILTIN_STATUSES = len(STATUS_NAMES)
+
+STRENGTH, DEXTERITY, WEAK, VULNERABLE, FRAIL, INTANGIBLE, ARTIFACT = range(7)
+
+
+def status_index(name):
+    # statuses outside the list get the next free slot the first time they are seen
+    index = STATUS_INDEX.get(name)
+    if index is None:
+        index = STATUS_INDEX[name] = len(STATUS_NAMES)
+        STATUS_NAMES.append(name)
+    return index
+
+
+# only these values feed the modifiers, other entries stay plain dicts
+_WATCHED = (STRENGTH, DEXTERITY)
+
+
+class StatusEntry(dict):
+    # Strength/Dexterity entry, writing its value invalidates the owner's modifiers
+    __slots__ = ("_block",)
+
+    def __init__(self, block, entry=()):
+        super().__init__(entry)
+        self._block = block
+
+    def __setitem__(self, key, value):
+        dict.__setitem__(self, key, value)
+        self._block.modifiers = None
+
+    def __delitem__(self, key):
+        dict.__delitem__(self, key)
+        self._block.modifiers = None
+
+    def pop(self, key, *default):
+        self._block.modifiers = None
+        return dict.pop(self, key, *default)
+
+    def update(self, *args, **kwargs):
+        dict.update(self, *args, **kwargs)
+        self._block.modifiers = None
+
+    def __reduce__(self):
+        return dict, (dict(self),)
+
+
+class StatusView(dict):
+    # the buff or debuff half of a StatusBlock, keyed by status name like the old dicts
+    __slots__ = ("_block", "slots")
+
+    def __init__(self, block, entries=None):
+        super().__init__()
+        self._block = block
+        self.slots = [None] * len(STATUS_NAMES)
+        if entries:
+            self.replace(entries)
+
+    def replace(self, entries):
+        if not entries and not self:
+            return
+        entries = list(entries.items())
+        dict.clear(self)
+        self.slots = [None] * len(STATUS_NAMES)
+        self._block.modifiers = None
+        for name, entry in entries:
+            self[name] = entry
+
+    def __setitem__(self, name, entry):
+        index = STATUS_INDEX.get(name)
+        if index is None or index >= len(self.slots):
+            index = status_index(name)
+            self.slots.extend([None] * (index + 1 - len(self.slots)))
+        entry = StatusEntry(self._block, entry) if index in _WATCHED else dict(entry)
+        dict.__setitem__(self, name, entry)
+        self.slots[index] = entry
+        self._block.modifiers = None
+
+    def __delitem__(self, name):
+        dict.__delitem__(self, name)
+        self.slots[STATUS_INDEX[name]] = None
+        self._block.modifiers = None
+
+    def pop(self, name, *default):
+        if name in self:
+            entry = dict.__getitem__(self, name)
+            del self[name]
+            return entry
+        return dict.pop(self, name, *default)
+
+    def clear(self):
+        self.replace({})
+
+    def update(self, entries=(), **kwargs):
+        for name, entry in dict(entries, **kwargs).items():
+            self[name] = entry
+
+    def __ior__(self, entries):
+        self.update(entries)
+        return self
+
+    def setdefault(self, name, entry=None):
+        if name not in self:
+            self[name] = {} if entry is None else entry
+        return dict.__getitem__(self, name)
+
+    def popitem(self):
+        if not self:
+            raise KeyError("popitem(): dictionary is empty")
+        name = next(reversed(self))
+        entry = dict.__getitem__(self, name)
+        del self[name]
+        return name, entry
+
+    def __reduce__(self):
+        # copied through the owning block, so entity.buffs stays the block's view in the copy
+        return getattr, (self._block, "buffs" if self._block.buffs is self else "debuffs")
+
+    def add_value(self, name, value, duration=None):
+        entry = self.get(name)
+        if entry is None:
+            self[name] = {"value": 0}
+            entry = dict.__getitem__(self, name)
+        entry["value"] += value
+        if duration is not None:
+            entry["duration"] = entry["duration"] + duration if "duration" in entry else duration
+
+    def add_duration(self, name, duration, value=None):
+        entry = self.get(name)
+        if entry is None:
+            self[name] = {"duration": 0}
+            entry = dict.__getitem__(self, name)
+        entry["duration"] += duration
+        if value is not None:
+            entry["value"] = entry["value"] + value if "value" in entry else value
+
+
+class StatusBlock:
+    __slots__ = ("buffs", "debuffs", "modifiers")
+
+    def __init__(self, buffs=None, debuffs=None):
+        # (strength, dexterity, weak, vulnerable, frail, intangible), None until refresh() after a change
+        self.modifiers = None
+        self.buffs = StatusView(self, buffs)
+        self.debuffs = StatusView(self, debuffs)
+
+    def __reduce__(self):
+        # the views point back at their block, so copies and pickles rebuild it from plain dicts
+        return StatusBlock, (copy_entries(self.buffs), copy_entries(self.debuffs))
+
+    def refresh(self):
+        buffs, debuffs = self.buffs.slots, self.debuffs.slots
+        strength, dexterity = buffs[STRENGTH], buffs[DEXTERITY]
+        self.modifiers = (
+            strength.get("value", 0) if strength is not None else 0,
+            dexterity.get("value", 0) if dexterity is not None else 0,
+            debuffs[WEAK] is not None,
+            debuffs[VULNERABLE] is not None,
+            debuffs[FRAIL] is not None,
+            buffs[INTANGIBLE] is not None,
+        )
+        return self.modifiers
+
+    def apply_buff(self, name, value, duration=None):
+        self.buffs.add_value(name, value, duration)
+
+    def apply_debuff(self, name, duration, value=None):
+        artifact = self.buffs.slots[ARTIFACT]
+        if artifact is not None and artifact["value"] > 0:
+            artifact["value"] -= 1
+            return False
+        self.debuffs.add_duration(name, duration, value)
+        return True
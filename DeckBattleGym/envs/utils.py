@@ -10,6 +10,9 @@ def has_buff(entity, name):
 def has_debuff(entity, name):
     return name in entity.debuffs
 
+def copy_entries(entries):
+    return {name: dict(entry) for name, entry in entries.items()}
+
 def resolve_target_selector(user, selector, battle):
     if selector == "self":
         return [user]
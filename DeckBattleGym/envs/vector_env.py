@@ -0,0 +1,164 @@
+import traceback
+import multiprocessing as mp
+import numpy as np
+from DeckBattleGym.envs.battle_env import BattleEnv
+
+
+# K BattleEnvs spread over worker processes. Observations, action masks, rewards and done flags
+# live in one shared buffer that every worker writes its rows of directly, so a step only sends the
+# actions and the end-of-episode infos through the pipes. Finished envs are reset automatically.
+
+
+def _layout(num_envs, observation_size, num_actions):
+    # (name, dtype, shape, byte offset) of every array in the shared buffer, and its total size
+    fields = (("obs", np.float32, (num_envs, observation_size)),
+              ("rewards", np.float32, (num_envs,)),
+              ("action_mask", np.bool_, (num_envs, num_actions)),
+              ("terminated", np.bool_, (num_envs,)),
+              ("truncated", np.bool_, (num_envs,)))
+    layout, offset = [], 0
+    for name, dtype, shape in fields:
+        layout.append((name, dtype, shape, offset))
+        offset += int(np.prod(shape)) * np.dtype(dtype).itemsize
+        offset += -offset % 8
+    return layout, offset
+
+
+def _views(buffer, layout):
+    return {name: np.frombuffer(buffer, dtype=dtype, count=int(np.prod(shape)), offset=offset).reshape(shape)
+            for name, dtype, shape, offset in layout}
+
+
+def _worker(indices, env_kwargs, buffer, layout, conn):
+    # runs the envs at rows indices, one command covers all of them. Every reply is ("ok", result) or
+    # ("error", traceback), an exception in one command is sent back instead of killing the worker
+    envs = [BattleEnv(**kwargs) for kwargs in env_kwargs]
+    views = _views(buffer, layout)
+    obs, masks = views["obs"], views["action_mask"]
+    rewards, terminated, truncated = views["rewards"], views["terminated"], views["truncated"]
+    try:
+        while True:
+            command, arg = conn.recv()
+            if command == "close":
+                break
+            try:
+                if command == "step":
+                    result = []
+                    for index, env, action in zip(indices, envs, arg):
+                        _, reward, done, cut, info = env.step(action, out=obs[index])
+                        rewards[index], terminated[index], truncated[index] = reward, done, cut
+                        if done or cut:
+                            info.pop("action_mask")
+                            env.reset(out=obs[index])
+                        else:
+                            info = None
+                        env.action_mask(out=masks[index])
+                        result.append(info)
+                elif command == "reset":
+                    for index, env, seed in zip(indices, envs, arg):
+                        env.reset(seed=seed, out=obs[index])
+                        env.action_mask(out=masks[index])
+                        rewards[index], terminated[index], truncated[index] = 0.0, False, False
+                    result = None
+                else:
+                    raise ValueError(f"[Env Error] Unknown worker command '{command}'.")
+            except Exception:
+                conn.send(("error", traceback.format_exc()))
+            else:
+                conn.send(("ok", result))
+    except (KeyboardInterrupt, EOFError):
+        pass
+    finally:
+        conn.close()
+
+
+class SubprocVectorEnv:
+    def __init__(self, env_kwargs, num_envs=None, num_workers=None, context=None):
+        # env_kwargs: BattleEnv keyword arguments, one dict shared by num_envs envs or a list of dicts.
+        # num_workers defaults to one process per env; fewer workers each step several envs per
+        # message, which pays off when steps are cheap next to a pipe round trip
+        if isinstance(env_kwargs, dict):
+            env_kwargs = [env_kwargs] * (num_envs or 1)
+        self.num_envs = len(env_kwargs)
+        probe = BattleEnv(**env_kwargs[0])
+        self.observation_size = probe.observation_size
+        self.num_actions = probe.num_actions
+        self.end_turn_action = probe.end_turn_action
+
+        ctx = mp.get_context(context)
+        layout, size = _layout(self.num_envs, self.observation_size, self.num_actions)
+        self._buffer = ctx.RawArray("b", size)
+        views = _views(self._buffer, layout)
+        self.obs = views["obs"]
+        self.action_mask = views["action_mask"]
+        self.rewards = views["rewards"]
+        self.terminated = views["terminated"]
+        self.truncated = views["truncated"]
+
+        num_workers = max(1, min(num_workers or self.num_envs, self.num_envs))
+        base, extra = divmod(self.num_envs, num_workers)
+        self._slices, start = [], 0
+        for worker in range(num_workers):
+            stop = start + base + (1 if worker < extra else 0)
+            self._slices.append(slice(start, stop))
+            start = stop
+
+        self._conns, self._processes = [], []
+        for rows in self._slices:
+            parent_conn, child_conn = ctx.Pipe()
+            process = ctx.Process(target=_worker, daemon=True,
+                                  args=(list(range(rows.start, rows.stop)), env_kwargs[rows], self._buffer, layout,
+                                        child_conn))
+            process.start()
+            child_conn.close()
+            self._conns.append(parent_conn)
+            self._processes.append(process)
+        self.closed = False
+
+    def reset(self, seed=None):
+        # env i is seeded with seed + i; returns (obs, infos) with info["action_mask"] per env
+        for rows, conn in zip(self._slices, self._conns):
+            conn.send(("reset", [None if seed is None else seed + index for index in range(rows.start, rows.stop)]))
+        self._receive()
+        return self.obs, [{"action_mask": self.action_mask[i]} for i in range(self.num_envs)]
+
+    def step(self, actions):
+        # returns (obs, rewards, terminated, truncated, infos). The arrays are the shared buffers and
+        # are overwritten by the next step, copy them to keep them. An env that finished this step
+        # has already been reset, its obs row is the new battle and its info has win and final_hp
+        for rows, conn in zip(self._slices, self._conns):
+            conn.send(("step", [int(action) for action in actions[rows]]))
+        infos = []
+        for result in self._receive():
+            infos.extend(info or {} for info in result)
+        return self.obs, self.rewards, self.terminated, self.truncated, infos
+
+    def _receive(self):
+        # one reply per worker, all read before raising so the pipes stay in step
+        replies = [conn.recv() for conn in self._conns]
+        for worker, (status, result) in enumerate(replies):
+            if status == "error":
+                raise ValueError(f"[Env Error] Worker {worker} failed:\n{result}")
+        return [result for _, result in replies]
+
+    def close(self):
+        if self.closed:
+            return
+        for conn in self._conns:
+            try:
+                conn.send(("close", None))
+            except (BrokenPipeError, OSError):
+                pass
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        for conn in self._conns:
+            conn.close()
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
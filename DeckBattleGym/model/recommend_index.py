@@ -0,0 +1,166 @@
+import os
+import json
+import sqlite3
+
+
+# On-disk recommendation index built once from experiment files. Plays are counted per
+# (turn, drawn hand) and per turn alone, with wins and losses kept apart; a lookup tries the exact
+# hand first and backs off to the turn when that hand was never seen. Every lookup is a primary-key
+# range scan, so it stays well under a millisecond however many battles went into the index.
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS hand_actions (
+    turn INTEGER, hand TEXT, card TEXT, targets TEXT,
+    wins INTEGER, losses INTEGER, seen INTEGER,
+    PRIMARY KEY (turn, hand, card, targets)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS turn_actions (
+    turn INTEGER, card TEXT, targets TEXT,
+    wins INTEGER, losses INTEGER, seen INTEGER,
+    PRIMARY KEY (turn, card, targets)
+) WITHOUT ROWID;
+"""
+
+# wins first like recommend_action_ranking, then fewer losses, then the order plays were first seen
+_ORDER = "ORDER BY wins DESC, losses ASC, seen ASC"
+
+
+def hand_key(card_ids):
+    # the hand as a multiset: draw order doesn't matter, duplicates do
+    return ",".join(sorted(card_ids))
+
+
+def _iter_file(path):
+    if path.endswith(".cols"):
+        from DeckBattleGym.sim.columnar_log import iter_columnar_simulations
+        return iter_columnar_simulations(path)
+    if path.endswith(".jsonl"):
+        from DeckBattleGym.sim.jsonl_log import iter_jsonl_simulations
+        return iter_jsonl_simulations(path)
+    with open(path) as f:
+        return iter(json.load(f)["simulations"])
+
+
+class RecommendIndex:
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.executescript(_SCHEMA)
+
+    @classmethod
+    def build(cls, db_path, sources):
+        index = cls(db_path)
+        for path in sources:
+            index.add_file(path)
+        return index
+
+    def _meta(self, key, default=None):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def _set_meta(self, key, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, json.dumps(value)))
+
+    @property
+    def battles(self):
+        return self._meta("battles", 0)
+
+    @property
+    def sources(self):
+        return self._meta("sources", [])
+
+    def add_battles(self, sims, source=None):
+        # counted in memory first, then upserted in one transaction; seen continues after existing rows
+        seen = self._meta("seen", 0)
+        hand_counts, turn_counts = {}, {}
+        battles = 0
+        for sim in sims:
+            battles += 1
+            column = 0 if sim["win"] else 1
+            for turn in sim["turns"]:
+                turn_num = turn["turn"]
+                hand = hand_key(turn["hand"])
+                for action in turn["actions"]:
+                    targets = ",".join(sorted(action.get("targets", [])))
+                    for counts, key in ((hand_counts, (turn_num, hand, action["card"], targets)),
+                                        (turn_counts, (turn_num, action["card"], targets))):
+                        entry = counts.get(key)
+                        if entry is None:
+                            entry = counts[key] = [0, 0, seen]
+                            seen += 1
+                        entry[column] += 1
+
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO hand_actions VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT DO UPDATE SET "
+                "wins = wins + excluded.wins, losses = losses + excluded.losses",
+                (key + tuple(entry) for key, entry in hand_counts.items()))
+            self.conn.executemany(
+                "INSERT INTO turn_actions VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT DO UPDATE SET "
+                "wins = wins + excluded.wins, losses = losses + excluded.losses",
+                (key + tuple(entry) for key, entry in turn_counts.items()))
+            self._set_meta("seen", seen)
+            self._set_meta("battles", self.battles + battles)
+            if source is not None:
+                self._set_meta("sources", self.sources + [source])
+        return self
+
+    def add_file(self, path):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Simulation file not found: {path}")
+        return self.add_battles(_iter_file(path), source=os.path.abspath(path))
+
+    def recommend(self, turn, hand, k=3, playable=None):
+        # hand: card ids drawn at the start of the turn; playable: card ids that may be recommended
+        # (defaults to the hand). Returns up to k of (card_id, target_ids, wins, losses, level), exact
+        # hand matches first (level "hand"), topped up from the turn-only counts (level "turn")
+        playable = sorted(set(hand if playable is None else playable))
+        if not playable:
+            return []
+        marks = ",".join("?" * len(playable))
+        results = [row + ("hand",) for row in self.conn.execute(
+            f"SELECT card, targets, wins, losses FROM hand_actions WHERE turn = ? AND hand = ? "
+            f"AND card IN ({marks}) {_ORDER} LIMIT ?",
+            (turn, hand_key(hand), *playable, k))]
+        if len(results) < k:
+            found = {(card, targets) for card, targets, _, _, _ in results}
+            for row in self.conn.execute(
+                    f"SELECT card, targets, wins, losses FROM turn_actions WHERE turn = ? "
+                    f"AND card IN ({marks}) {_ORDER} LIMIT ?",
+                    (turn, *playable, k + len(found))):
+                if (row[0], row[1]) not in found and len(results) < k:
+                    results.append(row + ("turn",))
+        return [(card, tuple(targets.split(",")) if targets else (), wins, losses, level)
+                for card, targets, wins, losses, level in results]
+
+    def recommend_cards(self, hand, turn, k=3, turn_hand=None):
+        # card-object version shaped like recommend_action_ranking: [(card, target_ids)]
+        by_id = {}
+        for card in hand:
+            by_id.setdefault(card.id, card)
+        key_hand = [card.id for card in (turn_hand if turn_hand is not None else hand)]
+        return [(by_id[card_id], list(targets))
+                for card_id, targets, _, _, _ in self.recommend(turn, key_hand, k=k, playable=list(by_id))]
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def open_index(db_path, sources):
+    # reuses db_path when it was built from exactly these files and none changed since, else rebuilds it
+    sources = [os.path.abspath(p) for p in sources]
+    if os.path.exists(db_path):
+        newest = max(os.path.getmtime(p) for p in sources)
+        index = RecommendIndex(db_path)
+        if index.sources == sources and os.path.getmtime(db_path) >= newest:
+            return index
+        index.close()
+        os.remove(db_path)
+    return RecommendIndex.build(db_path, sources)
@@ -18,24 +18,158 @@ def recommend_action_ranking(hand, turn, action_stats):
 
 
 def generate_action_stats(examine_path, only_wins=True):
-    if not os.path.exists(examine_path):
-        raise FileNotFoundError(f"Simulation file not found: {examine_path}")
+    return ActionStatsBuilder().add_file(examine_path).action_stats(only_wins=only_wins)
 
-    with open(examine_path) as f:
-        log = json.load(f)
 
-    action_stats = defaultdict(Counter)
+def _merge_counts(dst, src):
+    # keeps dst's order and appends keys seen first in src, as if src's battles came after dst's
+    for stat_key, counter in src.items():
+        dst[stat_key].update(counter)
 
-    for sim in log["simulations"]:
-        if only_wins and not sim["win"]: 
-            continue
-        for turn in sim["turns"]:
-            turn_num = turn["turn"]
-            stat_key = f"turn={turn_num}"
 
+class ActionStatsBuilder:
+    # Incremental version of generate_action_stats: battles are added one at a time (or a whole
+    # .json/.jsonl/.cols file), builders merge, and the state saves to and loads from json.
+    # Counts are kept for all battles and for won ones, each in first-seen order so most_common()
+    # breaks ties exactly like a single pass over the same battles.
+
+    def __init__(self):
+        self.battles = 0
+        self.wins = 0
+        self.all_counts = defaultdict(Counter)
+        self.win_counts = defaultdict(Counter)
+
+    def add_battle(self, sim):
+        won = sim["win"]
+        self.battles += 1
+        if won:
+            self.wins += 1
+        all_counts, win_counts = self.all_counts, self.win_counts
+        for turn in sim["turns"]:
+            stat_key = f"turn={turn['turn']}"
+            counter = all_counts[stat_key]
+            win_counter = win_counts[stat_key] if won else None
             for action in turn["actions"]:
-                card_id = action["card"]
-                targets = tuple(sorted(action.get("targets", [])))  
-                action_stats[stat_key][(card_id, targets)] += 1
-    
+                key = (action["card"], tuple(sorted(action.get("targets", []))))
+                counter[key] += 1
+                if won:
+                    win_counter[key] += 1
+        return self
+
+    def add_battles(self, sims):
+        for sim in sims:
+            self.add_battle(sim)
+        return self
+
+    def add_file(self, examine_path):
+        if not os.path.exists(examine_path):
+            raise FileNotFoundError(f"Simulation file not found: {examine_path}")
+        if examine_path.endswith(".cols"):
+            return self._add_columnar(examine_path)
+        if examine_path.endswith(".jsonl"):
+            from DeckBattleGym.sim.jsonl_log import iter_jsonl_simulations
+            return self.add_battles(iter_jsonl_simulations(examine_path))
+        with open(examine_path) as f:
+            log = json.load(f)
+        return self.add_battles(log["simulations"])
+
+    def _add_columnar(self, examine_path):
+        part = ActionStatsBuilder()
+        part.all_counts, part.battles, part.wins = _columnar_counts(examine_path, only_wins=False)
+        part.win_counts, _, _ = _columnar_counts(examine_path, only_wins=True)
+        return self.merge(part)
+
+    def merge(self, other):
+        self.battles += other.battles
+        self.wins += other.wins
+        _merge_counts(self.all_counts, other.all_counts)
+        _merge_counts(self.win_counts, other.win_counts)
+        return self
+
+    def action_stats(self, only_wins=True):
+        # same shape as generate_action_stats: "turn=N" -> Counter of (card_id, target_ids)
+        counts = self.win_counts if only_wins else self.all_counts
+        action_stats = defaultdict(Counter)
+        for stat_key, counter in counts.items():
+            if counter:
+                action_stats[stat_key] = Counter(counter)
+        return action_stats
+
+    def loss_counts(self):
+        losses = defaultdict(Counter)
+        for stat_key, counter in self.all_counts.items():
+            lost = counter - self.win_counts.get(stat_key, Counter())
+            if lost:
+                losses[stat_key] = lost
+        return losses
+
+    def to_dict(self):
+        def rows(counts):
+            return {stat_key: [[card_id, list(targets), count] for (card_id, targets), count in counter.items()]
+                    for stat_key, counter in counts.items()}
+        return {"battles": self.battles, "wins": self.wins,
+                "all": rows(self.all_counts), "won": rows(self.win_counts)}
+
+    @classmethod
+    def from_dict(cls, data):
+        builder = cls()
+        builder.battles = data["battles"]
+        builder.wins = data["wins"]
+        for name, counts in (("all", builder.all_counts), ("won", builder.win_counts)):
+            for stat_key, rows in data[name].items():
+                counter = counts[stat_key]
+                for card_id, targets, count in rows:
+                    counter[(card_id, tuple(targets))] = count
+        return builder
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+
+def generate_action_stats_columnar(examine_path, only_wins=True):
+    action_stats, _, _ = _columnar_counts(examine_path, only_wins=only_wins)
     return action_stats
+
+
+def _columnar_counts(examine_path, only_wins=True):
+    import numpy as np
+    from DeckBattleGym.sim.columnar_log import ColumnarLog
+
+    action_stats = defaultdict(Counter)
+
+    with ColumnarLog(examine_path) as log:
+        turn_offset = log["battle_turn_offset"]
+        action_offset = log["turn_action_offset"]
+        turn_battle = np.repeat(np.arange(len(log)), np.diff(turn_offset))
+        action_turn = np.repeat(np.arange(len(turn_battle)), np.diff(action_offset))
+
+        turn_num = log["turn_number"][action_turn].astype(np.int64)
+        cards = log["action_card"].astype(np.int64)
+        targets = log["action_target"].astype(np.int64)
+        if only_wins:
+            keep = log["battle_win"][turn_battle[action_turn]].astype(bool)
+            turn_num, cards, targets = turn_num[keep], cards[keep], targets[keep]
+
+        n_cards = max(len(log.card_ids), 1)
+        n_sets = max(len(log.target_sets), 1)
+        keys = (turn_num * n_cards + cards) * n_sets + targets
+        uniq, first, counts = np.unique(keys, return_index=True, return_counts=True)
+
+        # insert in order of first appearance so most_common() breaks ties like the json path
+        for i in np.argsort(first, kind="stable"):
+            key = int(uniq[i])
+            rest, target_index = divmod(key, n_sets)
+            turn, card_index = divmod(rest, n_cards)
+            stat_key = f"turn={turn}"
+            action_stats[stat_key][(log.card_ids[card_index], log.target_sets[target_index])] = int(counts[i])
+
+        num_battles = len(log)
+        num_wins = int(log["battle_win"].astype(bool).sum())
+
+    return action_stats, num_battles, num_wins
@@ -0,0 +1,229 @@
+import sys
+import os
+import json
+import time
+import timeit
+import platform
+import argparse
+import tempfile
+import tracemalloc
+import contextlib
+import io
+from collections import deque
+# -----------------------------------------------
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+# -----------------------------------------------
+
+from DeckBattleGym.envs.battle import Battle
+from DeckBattleGym.envs.player import Player
+from DeckBattleGym.envs.player_strategy import RandomStrategy
+from DeckBattleGym.envs.loader import ContentRegistry, get_registry
+from DeckBattleGym.sim.simulate_battle import _iter_battles, run_simulation
+from DeckBattleGym.model.stat_recommendsys import generate_action_stats
+
+
+# Fixed workload: every deck against every enemy group with RandomStrategy and the run seed below,
+# plus microbenchmarks of the hot paths. Results go to a json file that can be diffed between versions.
+
+_DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+_MICRO_DECK = "deck02"
+_MICRO_GROUP = "group06"
+
+
+def _peak_memory(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def _measure(fn, number, repeat, memory):
+    # best of `repeat` timings, each calling fn `number` times; peak memory from one extra traced call
+    seconds = min(timeit.repeat(fn, number=number, repeat=repeat))
+    return {
+        "ops": number,
+        "seconds": seconds,
+        "ops_per_sec": number / seconds if seconds else None,
+        "peak_bytes": _peak_memory(fn) if memory else None
+    }
+
+
+def bench_matrix(registry, num_battles=200, seed=0, repeat=1, memory=True):
+    cells = []
+    for deck_id, deck in registry.decks.items():
+        for group_id, group in registry.enemy_groups.items():
+            cell = {
+                "deck_id": deck_id,
+                "deck_name": deck["name"],
+                "enemygroup_id": group_id,
+                "enemygroup_name": group["name"],
+                "battles": num_battles
+            }
+            run = lambda: deque(_iter_battles(registry, deck_id, group_id, seed, 0, num_battles), maxlen=0)
+            try:
+                result = _measure(run, 1, repeat, memory)
+                wins = sum(sim["win"] for sim in _iter_battles(registry, deck_id, group_id, seed, 0, num_battles))
+            except Exception as e:
+                cell["error"] = f"{type(e).__name__}: {e}"
+            else:
+                cell["seconds"] = result["seconds"]
+                cell["battles_per_sec"] = num_battles / result["seconds"]
+                cell["peak_bytes"] = result["peak_bytes"]
+                cell["win_rate"] = wins / num_battles if num_battles else None
+            cells.append(cell)
+    return cells
+
+
+def bench_loader(repeat=3, memory=True):
+    paths = [os.path.join(_DATA_DIR, name) for name in ("card.json", "enemy.json", "deck.json", "enemy_group.json")]
+    registry = ContentRegistry.from_files(*paths)
+    return {
+        "loader.from_files": _measure(lambda: ContentRegistry.from_files(*paths), 20, repeat, memory),
+        "loader.deck": _measure(lambda: registry.deck(_MICRO_DECK), 2000, repeat, memory),
+        "loader.enemy_group": _measure(lambda: registry.enemy_group(_MICRO_GROUP), 2000, repeat, memory)
+    }
+
+
+def bench_card_apply(registry, repeat=3, memory=True):
+    player = Player(name="Hero", hp=80, energy=3)
+    enemies, _ = registry.enemy_group(_MICRO_GROUP)
+    for enemy in enemies:
+        enemy.hp = enemy.max_hp = 10 ** 12
+    results = {}
+    for card_id, targets in (("1", enemies[:1]), ("5", enemies), ("7", enemies[:1]), ("41", enemies)):
+        card = registry.card(card_id)
+
+        def play(card=card, targets=targets):
+            player.energy = 3
+            card.apply(player, targets)
+
+        results[f"card_apply.{card.name}"] = _measure(play, 20000, repeat, memory)
+    return results
+
+
+def bench_draw_cards(registry, repeat=3, memory=True):
+    deck, _ = registry.deck(_MICRO_DECK)
+    enemies, _ = registry.enemy_group(_MICRO_GROUP)
+    battle = Battle(Player(name="Hero", hp=80, energy=3, strategy=RandomStrategy()), enemies, deck,
+                    card_pool=registry.card_pool, registry=registry, seed=0)
+    battle.reset(seed=0)
+    battle.battle_start()
+
+    def draw():
+        battle.draw_cards(battle.draw_per_turn)
+        battle.discard_pile.extend(battle.hand)
+        battle.hand.clear()
+
+    return {"draw_cards": _measure(draw, 20000, repeat, memory)}
+
+
+def bench_action_stats(num_battles=500, seed=0, repeat=3, memory=True):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for output_format, extension in (("json", ".json"), ("columnar", ".cols")):
+            with contextlib.redirect_stdout(io.StringIO()):
+                run_simulation(os.path.join(_DATA_DIR, "deck.json"), _MICRO_DECK,
+                               os.path.join(_DATA_DIR, "enemy_group.json"), _MICRO_GROUP,
+                               num_simulations=num_battles, output_dir=tmp, seed=seed, output_format=output_format)
+            path = next(os.path.join(tmp, f) for f in os.listdir(tmp) if f.endswith(extension))
+            result = _measure(lambda: generate_action_stats(path), 1, repeat, memory)
+            result["battles_per_sec"] = num_battles / result["seconds"]
+            results[f"generate_action_stats.{output_format}"] = result
+    return results
+
+
+def run_benchmarks(output_path=None, num_battles=200, seed=0, repeat=3, memory=True, suite="all"):
+    registry = get_registry()
+    report = {
+        "meta": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "battles_per_cell": num_battles,
+            "seed": seed,
+            "repeat": repeat
+        }
+    }
+
+    if suite in ("all", "matrix"):
+        cells = bench_matrix(registry, num_battles=num_battles, seed=seed, memory=memory)
+        ok = [c for c in cells if "error" not in c]
+        seconds = sum(c["seconds"] for c in ok)
+        report["matrix"] = cells
+        report["matrix_total"] = {
+            "cells": len(cells),
+            "errors": len(cells) - len(ok),
+            "battles": num_battles * len(ok),
+            "seconds": seconds,
+            "battles_per_sec": num_battles * len(ok) / seconds if seconds else None
+        }
+
+    if suite in ("all", "micro"):
+        micro = {}
+        micro.update(bench_loader(repeat=repeat, memory=memory))
+        micro.update(bench_card_apply(registry, repeat=repeat, memory=memory))
+        micro.update(bench_draw_cards(registry, repeat=repeat, memory=memory))
+        micro.update(bench_action_stats(seed=seed, repeat=repeat, memory=memory))
+        report["micro"] = micro
+
+    if output_path is not None:
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+        with open(output_path, "w") as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+def _rate(entry):
+    return entry.get("battles_per_sec") or entry.get("ops_per_sec")
+
+
+def print_report(report, baseline=None):
+    # with a baseline report, each line also shows new/old speed
+    def line(name, entry, old):
+        if "error" in entry:
+            print(f"  {name:<45} ERROR {entry['error']}")
+            return
+        peak = f"{entry['peak_bytes'] / 1024:9.1f} KiB" if entry.get("peak_bytes") is not None else ""
+        ratio = f"  x{_rate(entry) / _rate(old):.2f}" if old and "error" not in old and _rate(old) else ""
+        print(f"  {name:<45} {_rate(entry):12.1f}/s {peak}{ratio}")
+
+    if "matrix" in report:
+        old_cells = {}
+        if baseline:
+            old_cells = {(c["deck_id"], c["enemygroup_id"]): c for c in baseline.get("matrix", [])}
+        print("[Benchmark] battles/sec, deck x enemy group")
+        for cell in report["matrix"]:
+            name = f"{cell['deck_name']} vs {cell['enemygroup_name']}"
+            line(name, cell, old_cells.get((cell["deck_id"], cell["enemygroup_id"])))
+        line("total", report["matrix_total"], baseline.get("matrix_total") if baseline else None)
+    if "micro" in report:
+        old_micro = baseline.get("micro", {}) if baseline else {}
+        print("[Benchmark] microbenchmarks, ops/sec (battles/sec for generate_action_stats)")
+        for name, entry in report["micro"].items():
+            line(name, entry, old_micro.get(name))
+
+
+if __name__ == "__main__":
+    base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    parser = argparse.ArgumentParser(description="Benchmark battle throughput and hot paths.")
+    parser.add_argument("--output", default=os.path.join(base_dir, "experiments", "benchmark.json"))
+    parser.add_argument("--baseline", help="earlier benchmark json to compare against")
+    parser.add_argument("--battles", type=int, default=200, help="battles per deck x group cell")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="microbenchmark timings, best one is kept")
+    parser.add_argument("--suite", choices=("all", "matrix", "micro"), default="all")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc peak memory pass")
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.output, num_battles=args.battles, seed=args.seed,
+                            repeat=args.repeat, memory=not args.no_memory, suite=args.suite)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    print(f"[Done] Saved benchmark to {args.output}")
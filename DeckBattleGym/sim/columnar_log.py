@@ -0,0 +1,216 @@
+import os
+import sys
+import json
+import mmap
+import struct
+from array import array
+import numpy as np
+
+from DeckBattleGym.sim.jsonl_log import read_jsonl_header, iter_jsonl_simulations
+
+
+# file layout: MAGIC | uint64 header length | json header | columns, each aligned to 8 bytes
+MAGIC = b"DBCOLS1\n"
+_ALIGN = 8
+_BYTEORDER = "<" if sys.byteorder == "little" else ">"
+
+# column name -> array typecode; *_offset columns hold n+1 entries indexing the next level.
+# hp is float because Reaper heals by ratio
+COLUMNS = {
+    "battle_final_hp": "f",
+    "battle_turns_taken": "h",
+    "battle_win": "B",
+    "battle_turn_offset": "q",
+    "turn_number": "h",
+    "turn_hp_left": "f",
+    "turn_hand_offset": "q",
+    "turn_action_offset": "q",
+    "hand_card": "H",
+    "action_card": "H",
+    "action_target": "H",
+    "target_set_mask": "I",
+}
+_NUMPY_KINDS = {"h": "i2", "B": "u1", "q": "i8", "H": "u2", "I": "u4", "f": "f4"}
+
+
+class ColumnarLogWriter:
+    def __init__(self, filepath, header):
+        self.filepath = filepath
+        self.header = header
+        self.count = 0
+        self.columns = {name: array(code) for name, code in COLUMNS.items()}
+        self.card_ids = {}
+        self.target_ids = {}
+        # targets are entity ids and all_enemies repeats them ("6", "6", "6"), so each sorted
+        # target tuple is interned as a set id and its bitmask over target_ids is kept alongside
+        self.target_sets = {}
+        self.columns["battle_turn_offset"].append(0)
+        self.columns["turn_hand_offset"].append(0)
+        self.columns["turn_action_offset"].append(0)
+
+    def update_header(self, **fields):
+        # the header is only written on close, so late fields just go into it
+        self.header = dict(self.header, **fields)
+
+    def _card_index(self, card_id):
+        index = self.card_ids.get(card_id)
+        if index is None:
+            index = self.card_ids[card_id] = len(self.card_ids)
+        return index
+
+    def _target_set_index(self, targets):
+        key = tuple(sorted(targets))
+        index = self.target_sets.get(key)
+        if index is None:
+            mask = 0
+            for target_id in key:
+                if target_id not in self.target_ids:
+                    if len(self.target_ids) >= 32:
+                        raise ValueError("[ColumnarLog] More than 32 distinct target ids.")
+                    self.target_ids[target_id] = len(self.target_ids)
+                mask |= 1 << self.target_ids[target_id]
+            index = self.target_sets[key] = len(self.target_sets)
+            self.columns["target_set_mask"].append(mask)
+        return index
+
+    def write(self, simulation):
+        cols = self.columns
+        cols["battle_final_hp"].append(simulation["final_hp"])
+        cols["battle_turns_taken"].append(simulation["turns_taken"])
+        cols["battle_win"].append(1 if simulation["win"] else 0)
+        for turn in simulation["turns"]:
+            cols["turn_number"].append(turn["turn"])
+            cols["turn_hp_left"].append(turn["hp_left"])
+            for card_id in turn["hand"]:
+                cols["hand_card"].append(self._card_index(card_id))
+            for action in turn["actions"]:
+                cols["action_card"].append(self._card_index(action["card"]))
+                cols["action_target"].append(self._target_set_index(action.get("targets", [])))
+            cols["turn_hand_offset"].append(len(cols["hand_card"]))
+            cols["turn_action_offset"].append(len(cols["action_card"]))
+        cols["battle_turn_offset"].append(len(cols["turn_number"]))
+        self.count += 1
+
+    def close(self):
+        if self.columns is None:
+            return
+        descriptors = {}
+        offset = 0
+        for name, column in self.columns.items():
+            descriptors[name] = {
+                "dtype": _BYTEORDER + _NUMPY_KINDS[column.typecode],
+                "offset": offset,
+                "count": len(column)
+            }
+            offset += -(-len(column) * column.itemsize // _ALIGN) * _ALIGN
+        header = json.dumps({
+            "meta": self.header,
+            "num_battles": self.count,
+            "card_ids": list(self.card_ids),
+            "target_ids": list(self.target_ids),
+            "target_sets": [[self.target_ids[t] for t in key] for key in self.target_sets],
+            "columns": descriptors
+        }).encode("utf-8")
+        header += b" " * (-(len(MAGIC) + 8 + len(header)) % _ALIGN)
+
+        with open(self.filepath, "wb") as f:
+            f.write(MAGIC)
+            f.write(struct.pack("<Q", len(header)))
+            f.write(header)
+            for column in self.columns.values():
+                data = column.tobytes()
+                f.write(data)
+                f.write(b"\0" * (-len(data) % _ALIGN))
+        self.columns = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ColumnarLog:
+    def __init__(self, filepath):
+        self.filepath = filepath
+        with open(filepath, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            self._mmap.close()
+            raise ValueError(f"[ColumnarLog] {filepath} is not a columnar experiment log.")
+        (header_len,) = struct.unpack_from("<Q", self._mmap, len(MAGIC))
+        data_start = len(MAGIC) + 8 + header_len
+        header = json.loads(self._mmap[len(MAGIC) + 8:data_start])
+
+        self.meta = header["meta"]
+        self.num_battles = header["num_battles"]
+        self.card_ids = header["card_ids"]
+        self.target_ids = header["target_ids"]
+        self.target_sets = [tuple(self.target_ids[i] for i in s) for s in header["target_sets"]]
+        # views straight into the mapped file, nothing is copied
+        self.columns = {
+            name: np.frombuffer(self._mmap, dtype=d["dtype"], count=d["count"], offset=data_start + d["offset"])
+            for name, d in header["columns"].items()
+        }
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def __len__(self):
+        return self.num_battles
+
+    def close(self):
+        # arrays already handed out keep the mapping alive until they are dropped
+        self.columns = None
+        self._mmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def iter_columnar_simulations(filepath):
+    # rebuilds the json-style simulation dicts, for consumers that walk battles one by one
+    with ColumnarLog(filepath) as log:
+        card_ids, target_sets = log.card_ids, log.target_sets
+        final_hp = log["battle_final_hp"].tolist()
+        turns_taken = log["battle_turns_taken"].tolist()
+        win = log["battle_win"].tolist()
+        turn_offset = log["battle_turn_offset"].tolist()
+        turn_number = log["turn_number"].tolist()
+        hp_left = log["turn_hp_left"].tolist()
+        hand_offset = log["turn_hand_offset"].tolist()
+        action_offset = log["turn_action_offset"].tolist()
+        hand_card = log["hand_card"].tolist()
+        action_card = log["action_card"].tolist()
+        action_target = log["action_target"].tolist()
+    for b in range(len(final_hp)):
+        turns = []
+        for t in range(turn_offset[b], turn_offset[b + 1]):
+            turns.append({
+                "turn": turn_number[t],
+                "hand": [card_ids[c] for c in hand_card[hand_offset[t]:hand_offset[t + 1]]],
+                "actions": [{"card": card_ids[action_card[a]], "targets": list(target_sets[action_target[a]])}
+                            for a in range(action_offset[t], action_offset[t + 1])],
+                "hp_left": hp_left[t]
+            })
+        yield {"final_hp": final_hp[b], "turns_taken": turns_taken[b], "win": bool(win[b]), "turns": turns}
+
+
+def convert_to_columnar(src_path, dst_path=None):
+    if dst_path is None:
+        dst_path = os.path.splitext(src_path)[0] + ".cols"
+    if src_path.endswith(".jsonl"):
+        header = read_jsonl_header(src_path)
+        simulations = iter_jsonl_simulations(src_path)
+    else:
+        with open(src_path) as f:
+            log = json.load(f)
+        simulations = log.pop("simulations")
+        header = log
+    with ColumnarLogWriter(dst_path, header) as writer:
+        for sim in simulations:
+            writer.write(sim)
+    return dst_path
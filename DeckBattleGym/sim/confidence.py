@@ -0,0 +1,43 @@
+import math
+from statistics import NormalDist
+
+
+# Confidence intervals behind the adaptive simulation budget: Wilson for one win rate (stays inside
+# [0, 1] and behaves at 0% and 100%, where easy matchups live), Agresti-Min for the difference of two
+# decks' win rates over paired battles. Early stopping also waits for min_simulations battles, so a
+# lucky first batch cannot end a run.
+
+
+def z_score(confidence=0.95):
+    return NormalDist().inv_cdf(0.5 + confidence / 2)
+
+
+def wilson_interval(wins, n, confidence=0.95):
+    if n == 0:
+        return 0.0, 1.0
+    z = z_score(confidence)
+    p = wins / n
+    denom = 1 + z * z / n
+    center = (p + z * z / (2 * n)) / denom
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+    return max(0.0, center - half), min(1.0, center + half)
+
+
+def paired_difference_interval(n, a_only, b_only, confidence=0.95):
+    # from the number of pairs and the discordant ones (only deck A won, only deck B won). Half a
+    # battle is added to each cell of the 2x2 table, so the interval keeps a width when every pair
+    # so far had the same outcome
+    m = n + 2
+    p_a = (a_only + 0.5) / m
+    p_b = (b_only + 0.5) / m
+    diff = p_a - p_b
+    half = z_score(confidence) * math.sqrt(max(0.0, p_a + p_b - diff * diff) / m)
+    return max(-1.0, diff - half), min(1.0, diff + half)
+
+
+def can_stop(interval, n, target_width, min_simulations):
+    return n >= min_simulations and interval_width(interval) <= target_width
+
+
+def interval_width(interval):
+    return interval[1] - interval[0]
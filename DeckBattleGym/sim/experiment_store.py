@@ -0,0 +1,232 @@
+import json
+import time
+import sqlite3
+import contextlib
+
+
+# Optional local store for simulation results. Every run_simulation call becomes a row in runs and
+# its battles, turns and actions are bulk-inserted under it, so results accumulate across runs
+# instead of overwriting {deck}_vs_{group}.json, and questions like "win rate of deck X vs group Y
+# when card 32 was played on turn 1" are answered by indexed SQL instead of parsing files.
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY,
+    created TEXT,
+    deck_id TEXT, deck_name TEXT,
+    enemygroup_id TEXT, enemygroup_name TEXT,
+    seed INTEGER,
+    cards TEXT,
+    num_battles INTEGER
+);
+CREATE TABLE IF NOT EXISTS battles (
+    battle_id INTEGER PRIMARY KEY,
+    run_id INTEGER,
+    battle_index INTEGER,
+    win INTEGER,
+    final_hp REAL,
+    turns_taken INTEGER
+);
+CREATE TABLE IF NOT EXISTS turns (
+    battle_id INTEGER, turn INTEGER, hp_left REAL, hand TEXT,
+    PRIMARY KEY (battle_id, turn)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS actions (
+    battle_id INTEGER, turn INTEGER, seq INTEGER, card TEXT, targets TEXT,
+    PRIMARY KEY (battle_id, turn, seq)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS runs_matchup ON runs (deck_id, enemygroup_id);
+CREATE INDEX IF NOT EXISTS battles_run ON battles (run_id);
+CREATE INDEX IF NOT EXISTS actions_card ON actions (card, turn, battle_id);
+"""
+
+# battles buffered before each executemany
+_BATCH = 500
+# seconds a connection waits for another writer before "database is locked"
+_BUSY_TIMEOUT = 60
+
+
+class RunWriter:
+    # same write()/close() shape as JsonlResultWriter. Each flushed batch is its own short write
+    # transaction, so runs writing to the same file from several processes only wait for each other's
+    # batches. The run's num_battles is set on close; until then queries leave its battles out
+    def __init__(self, store, run_id):
+        self.store = store
+        self.run_id = run_id
+        self.count = 0
+        # battles, turns and actions refer to battles by their index in the run until they are flushed
+        self._battles, self._turns, self._actions = [], [], []
+
+    def write(self, simulation):
+        index = self.count
+        self._battles.append((index, 1 if simulation["win"] else 0, simulation["final_hp"], simulation["turns_taken"]))
+        for turn in simulation["turns"]:
+            turn_num = turn["turn"]
+            self._turns.append((index, turn_num, turn["hp_left"], ",".join(turn["hand"])))
+            for seq, action in enumerate(turn["actions"]):
+                self._actions.append((index, turn_num, seq, action["card"], ",".join(action.get("targets", []))))
+        self.count += 1
+        if len(self._battles) >= _BATCH:
+            with self.store.write_transaction():
+                self._flush()
+
+    def _flush(self):
+        # battle ids are taken inside the write transaction, so concurrent runs never pick the same ones
+        if not self._battles:
+            return
+        conn = self.store.conn
+        (last_battle,) = conn.execute("SELECT COALESCE(MAX(battle_id), 0) FROM battles").fetchone()
+        offset = last_battle + 1 - self._battles[0][0]
+        run_id = self.run_id
+        conn.executemany("INSERT INTO battles VALUES (?, ?, ?, ?, ?, ?)",
+                         [(index + offset, run_id, index, win, final_hp, turns_taken)
+                          for index, win, final_hp, turns_taken in self._battles])
+        conn.executemany("INSERT INTO turns VALUES (?, ?, ?, ?)",
+                         [(index + offset, turn, hp_left, hand) for index, turn, hp_left, hand in self._turns])
+        conn.executemany("INSERT INTO actions VALUES (?, ?, ?, ?, ?)",
+                         [(index + offset, turn, seq, card, targets)
+                          for index, turn, seq, card, targets in self._actions])
+        self._battles, self._turns, self._actions = [], [], []
+
+    def close(self):
+        if self.run_id is None:
+            return
+        with self.store.write_transaction():
+            self._flush()
+            self.store.conn.execute("UPDATE runs SET num_battles = ? WHERE run_id = ?", (self.count, self.run_id))
+        self.run_id = None
+
+    def discard(self):
+        # a failed run leaves nothing behind, including batches already flushed
+        if self.run_id is None:
+            return
+        self._battles, self._turns, self._actions = [], [], []
+        with self.store.write_transaction() as conn:
+            battle_ids = "SELECT battle_id FROM battles WHERE run_id = ?"
+            conn.execute(f"DELETE FROM actions WHERE battle_id IN ({battle_ids})", (self.run_id,))
+            conn.execute(f"DELETE FROM turns WHERE battle_id IN ({battle_ids})", (self.run_id,))
+            conn.execute("DELETE FROM battles WHERE run_id = ?", (self.run_id,))
+            conn.execute("DELETE FROM runs WHERE run_id = ?", (self.run_id,))
+        self.run_id = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.discard()
+            return
+        self.close()
+
+
+class ExperimentStore:
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, timeout=_BUSY_TIMEOUT)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+
+    @contextlib.contextmanager
+    def write_transaction(self):
+        # BEGIN IMMEDIATE takes the write lock up front (waiting up to the busy timeout), so a
+        # transaction that reads before it writes cannot fail halfway on a lock upgrade
+        conn = self.conn
+        if conn.in_transaction:
+            conn.commit()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+
+    def run_writer(self, deck_id, deck_name, enemygroup_id, enemygroup_name, seed=None, cards=()):
+        with self.write_transaction() as conn:
+            cur = conn.execute(
+                "INSERT INTO runs (created, deck_id, deck_name, enemygroup_id, enemygroup_name, seed, cards, num_battles) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, 0)",
+                (time.strftime("%Y-%m-%dT%H:%M:%S"), deck_id, deck_name, enemygroup_id, enemygroup_name,
+                 seed, json.dumps(list(cards))))
+        return RunWriter(self, cur.lastrowid)
+
+    def add_run(self, deck_id, deck_name, enemygroup_id, enemygroup_name, simulations, seed=None, cards=()):
+        with self.run_writer(deck_id, deck_name, enemygroup_id, enemygroup_name, seed, cards) as writer:
+            run_id = writer.run_id
+            for sim in simulations:
+                writer.write(sim)
+        return run_id
+
+    # ---- queries ----
+
+    @staticmethod
+    def _battle_filter(deck_id=None, enemygroup_id=None, run_id=None, card=None, turn=None, only_wins=False):
+        # WHERE clause over battles b joined to runs r; card (and turn) keep battles where that card was played.
+        # Runs still being written (num_battles not set yet) are left out
+        clauses, params = ["r.num_battles > 0"], []
+        for column, value in (("r.deck_id", deck_id), ("r.enemygroup_id", enemygroup_id), ("b.run_id", run_id)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if card is not None:
+            if turn is not None:
+                clauses.append("b.battle_id IN (SELECT battle_id FROM actions WHERE card = ? AND turn = ?)")
+                params += [card, turn]
+            else:
+                clauses.append("b.battle_id IN (SELECT battle_id FROM actions WHERE card = ?)")
+                params.append(card)
+        if only_wins:
+            clauses.append("b.win = 1")
+        return "WHERE " + " AND ".join(clauses), params
+
+    def runs(self, deck_id=None, enemygroup_id=None):
+        where, params = self._battle_filter(deck_id, enemygroup_id)
+        rows = self.conn.execute(
+            f"SELECT run_id, created, deck_id, deck_name, enemygroup_id, enemygroup_name, seed, num_battles "
+            f"FROM runs r {where} ORDER BY run_id", params).fetchall()
+        keys = ("run_id", "created", "deck_id", "deck_name", "enemygroup_id", "enemygroup_name", "seed", "num_battles")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def win_rate(self, deck_id=None, enemygroup_id=None, run_id=None, card=None, turn=None):
+        # (win rate, battles) over every stored battle matching the filters
+        where, params = self._battle_filter(deck_id, enemygroup_id, run_id, card, turn)
+        battles, wins = self.conn.execute(
+            f"SELECT COUNT(*), COALESCE(SUM(b.win), 0) FROM battles b JOIN runs r USING (run_id) {where}",
+            params).fetchone()
+        return (wins / battles if battles else 0.0), battles
+
+    def turn_stats(self, deck_id=None, enemygroup_id=None, run_id=None, card=None, turn=None, only_wins=False):
+        where, params = self._battle_filter(deck_id, enemygroup_id, run_id, card, turn, only_wins)
+        battles, mean_turns, min_turns, max_turns, mean_hp = self.conn.execute(
+            f"SELECT COUNT(*), AVG(b.turns_taken), MIN(b.turns_taken), MAX(b.turns_taken), AVG(b.final_hp) "
+            f"FROM battles b JOIN runs r USING (run_id) {where}", params).fetchone()
+        return {"battles": battles, "mean_turns": mean_turns, "min_turns": min_turns,
+                "max_turns": max_turns, "mean_final_hp": mean_hp}
+
+    def action_frequencies(self, deck_id=None, enemygroup_id=None, run_id=None, turn=None, only_wins=False, limit=None):
+        # [(turn, card, target_ids, plays, battles won when played)], most played first
+        where, params = self._battle_filter(deck_id, enemygroup_id, run_id, only_wins=only_wins)
+        if turn is not None:
+            where += " AND a.turn = ?"
+            params.append(turn)
+        sql = (f"SELECT a.turn, a.card, a.targets, COUNT(*), SUM(b.win) FROM actions a "
+               f"JOIN battles b USING (battle_id) JOIN runs r USING (run_id) {where} "
+               f"GROUP BY a.turn, a.card, a.targets ORDER BY COUNT(*) DESC, a.turn, a.card")
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [(turn, card, tuple(targets.split(",")) if targets else (), plays, wins)
+                for turn, card, targets, plays, wins in self.conn.execute(sql, params)]
+
+    def query(self, sql, params=()):
+        return self.conn.execute(sql, params).fetchall()
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,209 @@
+import os
+import json
+import mmap
+import random
+import shutil
+from array import array
+
+
+# Each .jsonl result file gets a sidecar "<file>.idx": uint64 byte offsets of every battle line plus
+# the end of the last one (n+1 entries), so battle i is bytes offsets[i]:offsets[i+1] of the file.
+
+def index_path(filepath):
+    return filepath + ".idx"
+
+
+class JsonlResultWriter:
+    def __init__(self, filepath, header, header_reserve=0):
+        # header_reserve: spaces left at the end of the header line, so update_header() can usually
+        # rewrite it in place instead of copying the whole file
+        self.filepath = filepath
+        self.count = 0
+        self.header = dict(header)
+        self._header_changed = False
+        self._file = open(filepath, "w", encoding="utf-8", newline="\n")
+        self._offsets = array("Q")
+        self._offset = 0
+        self._write_line(header, header_reserve)
+        self._offsets.append(self._offset)
+
+    def _write_line(self, record, padding=0):
+        # json.dumps escapes non-ascii, so the string length is the byte length
+        line = json.dumps(record, separators=(",", ":")) + " " * padding + "\n"
+        self._file.write(line)
+        self._file.flush()
+        self._offset += len(line)
+
+    def update_header(self, **fields):
+        # header fields only known once the run is over, written when the writer closes
+        self.header.update(fields)
+        self._header_changed = True
+
+    def write(self, simulation):
+        self._write_line(simulation)
+        self._offsets.append(self._offset)
+        self.count += 1
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+            if self._header_changed:
+                self._rewrite_header()
+            _save_index(self.filepath, self._offsets)
+
+    def _rewrite_header(self):
+        line = json.dumps(self.header, separators=(",", ":"))
+        old_size = self._offsets[0]
+        if len(line) < old_size:
+            with open(self.filepath, "r+b") as f:
+                f.write((line + " " * (old_size - 1 - len(line))).encode("utf-8"))
+            return
+        # no room on the old line: copy the battles after the new one and shift the index
+        tmp_path = self.filepath + ".tmp"
+        with open(self.filepath, "rb") as src, open(tmp_path, "wb") as dst:
+            dst.write((line + "\n").encode("utf-8"))
+            src.seek(old_size)
+            shutil.copyfileobj(src, dst)
+        os.replace(tmp_path, self.filepath)
+        shift = len(line) + 1 - old_size
+        self._offsets = array("Q", (offset + shift for offset in self._offsets))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def read_jsonl_header(filepath):
+    with open(filepath, "r", encoding="utf-8") as f:
+        return json.loads(f.readline())
+
+
+def iter_jsonl_simulations(filepath):
+    with open(filepath, "r", encoding="utf-8") as f:
+        f.readline()
+        for line in f:
+            # a run that crashed mid-write leaves an unterminated last line, skip it
+            if not line.endswith("\n"):
+                break
+            if line.strip():
+                yield json.loads(line)
+
+
+def _save_index(filepath, offsets):
+    with open(index_path(filepath), "wb") as f:
+        offsets.tofile(f)
+
+
+def _scan_offsets(data, start):
+    offsets = array("Q", [start])
+    find = data.find
+    pos = find(b"\n", start)
+    while pos != -1:
+        offsets.append(pos + 1)
+        pos = find(b"\n", pos + 1)
+    return offsets
+
+
+def _load_index(filepath, data, start):
+    # the sidecar is trusted only if it is newer than the data and ends where the last full line does
+    path = index_path(filepath)
+    if not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(filepath):
+        return None
+    size = os.path.getsize(path)
+    if size < 8 or size % 8:
+        return None
+    offsets = array("Q")
+    with open(path, "rb") as f:
+        offsets.fromfile(f, size // 8)
+    if offsets[0] != start or offsets[-1] != data.rfind(b"\n") + 1:
+        return None
+    return offsets
+
+
+class JsonlLog:
+    # Random access to a .jsonl result file through mmap: log[i], log[a:b] and sample() only
+    # parse the battles asked for, and processes opening the same file share its pages.
+    def __init__(self, filepath):
+        self.filepath = filepath
+        with open(filepath, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        header_end = self._mmap.find(b"\n") + 1
+        if header_end == 0:
+            self._mmap.close()
+            raise ValueError(f"[JsonlLog] {filepath} has no header line.")
+        self.header = json.loads(self._mmap[:header_end])
+        self._offsets = _load_index(filepath, self._mmap, header_end)
+        if self._offsets is None:
+            self._offsets = _scan_offsets(self._mmap, header_end)
+            try:
+                _save_index(filepath, self._offsets)
+            except OSError:
+                # read-only location, keep the index in memory
+                pass
+        self.num_battles = len(self._offsets) - 1
+
+    def __len__(self):
+        return self.num_battles
+
+    def raw(self, i):
+        # the undecoded json line of battle i
+        if i < 0:
+            i += self.num_battles
+        if not 0 <= i < self.num_battles:
+            raise IndexError(f"battle {i} out of range for {self.num_battles} battles")
+        return self._mmap[self._offsets[i]:self._offsets[i + 1]]
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [json.loads(self.raw(j)) for j in range(*i.indices(self.num_battles))]
+        return json.loads(self.raw(i))
+
+    def __iter__(self):
+        for i in range(self.num_battles):
+            yield json.loads(self.raw(i))
+
+    def sample(self, k, seed=None):
+        # k distinct battles, read in file order
+        indices = sorted(random.Random(seed).sample(range(self.num_battles), k))
+        return [json.loads(self.raw(i)) for i in indices]
+
+    def __reduce__(self):
+        # worker processes reopen the file and map the same pages instead of copying parsed battles
+        return (type(self), (self.filepath,))
+
+    def close(self):
+        if self._mmap is None:
+            return
+        self._mmap.close()
+        self._mmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def convert_to_jsonl(src_path, dst_path=None):
+    # rewrites a legacy .json experiment as .jsonl plus its index
+    if dst_path is None:
+        dst_path = os.path.splitext(src_path)[0] + ".jsonl"
+    with open(src_path) as f:
+        log = json.load(f)
+    simulations = log.pop("simulations")
+    with JsonlResultWriter(dst_path, log) as writer:
+        for sim in simulations:
+            writer.write(sim)
+    return dst_path
+
+
+def open_jsonl_log(filepath):
+    # a .json experiment is converted once to a sibling .jsonl, reconverted only when the .json is newer
+    if filepath.endswith(".json"):
+        jsonl_path = os.path.splitext(filepath)[0] + ".jsonl"
+        if not os.path.exists(jsonl_path) or os.path.getmtime(jsonl_path) < os.path.getmtime(filepath):
+            convert_to_jsonl(filepath, jsonl_path)
+        filepath = jsonl_path
+    return JsonlLog(filepath)
@@ -1,76 +1,407 @@
 import sys
 import os
 import json
+import math
+import random
+import contextlib
+from collections import deque
+from itertools import islice
 # -----------------------------------------------
 project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 sys.path.insert(0, project_root)
 # -----------------------------------------------
 
-from copy import deepcopy
+from concurrent.futures import ProcessPoolExecutor
 from DeckBattleGym.envs.battle import Battle
 from DeckBattleGym.envs.player import Player
 from DeckBattleGym.envs.player_strategy import RandomStrategy
-from DeckBattleGym.envs.loader import load_card_pool, load_deck_by_id, load_enemy_group
+from DeckBattleGym.envs.loader import get_registry
+from DeckBattleGym.envs.profiler import BattleProfiler
+from DeckBattleGym.sim.jsonl_log import JsonlResultWriter
+from DeckBattleGym.sim.confidence import wilson_interval, paired_difference_interval, can_stop
+
+
+# per-process state filled by _init_worker, so every worker parses the json files only once
+_worker_state = {}
+# upper bound on battles per worker task, keeps streamed runs from buffering whole worker shares
+_CHUNK_SIZE = 500
+# chunks queued or running per worker in _iter_range
+_WINDOW_PER_WORKER = 2
+
+
+def _load_setup(deck_json_path, deck_id, enemygroup_json_path, enemygroup_id):
+    registry = get_registry(deck_path=deck_json_path, group_path=enemygroup_json_path)
+    deck, deck_name = registry.deck(deck_id)
+    _, enemygroup_name = registry.enemy_group(enemygroup_id)
+    return registry, deck, deck_name, enemygroup_name
+
+
+def battle_seed(run_seed, index):
+    # depends only on the run seed and the battle's position, so results don't change with the
+    # worker count, and two decks run with the same seed see the same stream for battle i
+    return (run_seed << 32) | index
+
+
+def _iter_battles(registry, deck_id, enemygroup_id, run_seed, start, num_battles, profiler=None):
+    player = Player(name="Hero", hp=80, energy=3, strategy=RandomStrategy())
+    deck, _ = registry.deck(deck_id)
+    enemies, _ = registry.enemy_group(enemygroup_id)
+    battle = Battle(player, enemies, deck, card_pool=registry.card_pool,if_battle_log=False, registry=registry,
+                    profiler=profiler)
+
+    for index in range(start, start + num_battles):
+        battle.reset(seed=battle_seed(run_seed, index))
+        battle.run()
+
+        yield {
+            "final_hp": player.hp,
+            "turns_taken": battle.turn,
+            "win": player.hp > 0,
+            "turns": battle.simulation_log["turns"]
+        }
+
+
+def _init_worker(deck_json_path, enemygroup_json_path, enemygroup_id):
+    _worker_state["registry"] = get_registry(deck_path=deck_json_path, group_path=enemygroup_json_path)
+    _worker_state["enemygroup_id"] = enemygroup_id
+
+
+def _run_chunk(deck_id, run_seed, start, num_battles, profile=False):
+    # the chunk's profile travels back as a plain dict and is merged in the parent
+    profiler = BattleProfiler() if profile else None
+    sims = list(_iter_battles(_worker_state["registry"], deck_id, _worker_state["enemygroup_id"],
+                              run_seed, start, num_battles, profiler))
+    return sims, profiler.to_dict() if profile else None
+
+
+def _split_chunks(num_simulations, num_chunks):
+    base, extra = divmod(num_simulations, num_chunks)
+    return [base + (1 if i < extra else 0) for i in range(num_chunks)]
+
+
+@contextlib.contextmanager
+def _simulation_pool(deck_json_path, enemygroup_json_path, enemygroup_id, workers):
+    # None when everything runs in this process; workers can play any deck from deck_json_path
+    if workers <= 1:
+        yield None
+        return
+    with ProcessPoolExecutor(max_workers=workers,
+                             initializer=_init_worker,
+                             initargs=(deck_json_path, enemygroup_json_path, enemygroup_id)) as executor:
+        yield executor
+
+
+def _iter_range(executor, registry, deck_id, enemygroup_id, seed, start, num_battles, workers, profiler=None):
+    # battles start .. start+num_battles-1, in order
+    workers = max(1, min(workers, num_battles))
+    if executor is None or workers == 1:
+        yield from _iter_battles(registry, deck_id, enemygroup_id, seed, start, num_battles, profiler)
+        return
+
+    # at most _WINDOW_PER_WORKER chunks per worker are in flight, the next one is submitted as each is
+    # taken, so a slow consumer never has the rest of the run waiting in finished futures
+    num_chunks = max(workers, -(-num_battles // _CHUNK_SIZE))
+    chunk_sizes = _split_chunks(num_battles, num_chunks)
+    chunk_starts = [start + sum(chunk_sizes[:i]) for i in range(num_chunks)]
+    chunks = zip(chunk_starts, chunk_sizes)
+    profile = profiler is not None
+    window = deque(executor.submit(_run_chunk, deck_id, seed, chunk_start, size, profile)
+                   for chunk_start, size in islice(chunks, _WINDOW_PER_WORKER * workers))
+    try:
+        while window:
+            chunk, chunk_profile = window.popleft().result()
+            for chunk_start, size in islice(chunks, 1):
+                window.append(executor.submit(_run_chunk, deck_id, seed, chunk_start, size, profile))
+            if chunk_profile is not None:
+                profiler.merge(chunk_profile)
+            yield from chunk
+    finally:
+        # a consumer that stops early leaves nothing queued behind it
+        for future in window:
+            future.cancel()
+
+
+def _iter_simulations(deck_json_path, deck_id, enemygroup_json_path, enemygroup_id,
+                      registry, num_simulations, workers, seed, profiler=None):
+    workers = max(1, min(workers, num_simulations))
+    with _simulation_pool(deck_json_path, enemygroup_json_path, enemygroup_id, workers) as executor:
+        yield from _iter_range(executor, registry, deck_id, enemygroup_id, seed, 0, num_simulations, workers, profiler)
+
+
+def _iter_adaptive(deck_json_path, deck_id, enemygroup_json_path, enemygroup_id,
+                   registry, max_simulations, workers, seed, profiler,
+                   batch_size, target_ci_width, confidence, min_simulations, outcome):
+    # batches of battles 0, 1, 2, ... until the win rate's Wilson interval is narrow enough, so an
+    # adaptive run is a prefix of the fixed-size run with the same seed. outcome gets the totals
+    played = wins = 0
+    workers = max(1, min(workers, batch_size))
+    with _simulation_pool(deck_json_path, enemygroup_json_path, enemygroup_id, workers) as executor:
+        while played < max_simulations:
+            size = min(batch_size, max_simulations - played)
+            for sim in _iter_range(executor, registry, deck_id, enemygroup_id, seed, played, size, workers, profiler):
+                wins += sim["win"]
+                yield sim
+            played += size
+            if can_stop(wilson_interval(wins, played, confidence), played, target_ci_width, min_simulations):
+                break
+    outcome.update(num_simulations=played, wins=wins, ci=wilson_interval(wins, played, confidence))
+
+
+def _feed_stats(simulations, action_stats):
+    for sim in simulations:
+        action_stats.add_battle(sim)
+        yield sim
+
+
+def _feed_store(simulations, writer):
+    for sim in simulations:
+        writer.write(sim)
+        yield sim
+
+
+def _new_run_seed():
+    return random.SystemRandom().getrandbits(32)
 
 
 def run_simulation(deck_json_path, deck_id, 
                    enemygroup_json_path, enemygroup_id, 
                    num_simulations=100, 
-                   output_dir=None):
-    
+                   output_dir=None,
+                   workers=1,
+                   seed=None,
+                   output_format="json",
+                   profile=None,
+                   action_stats=None,
+                   store=None,
+                   target_ci_width=None,
+                   batch_size=100,
+                   confidence=0.95,
+                   min_simulations=100):
+    # profile=True times every phase, card and enemy intent (see BattleProfiler); pass a
+    # BattleProfiler instead to accumulate over several runs. Returns (profiler or None, outcome), where
+    # outcome has num_simulations actually played and filepath (adaptive runs add wins and ci).
+    # action_stats takes an ActionStatsBuilder that is updated with each battle as it finishes.
+    # store (an ExperimentStore or a path to its SQLite file) also records the run there.
+    # target_ci_width switches to adaptive mode: batches of batch_size battles until the win rate's
+    # confidence interval is at most that wide (and at least min_simulations played), num_simulations
+    # is then the cap
+    if target_ci_width is not None and batch_size < 1:
+        raise ValueError(f"[Simulation Error] batch_size must be at least 1 for adaptive runs, got {batch_size}.")
     if output_dir is None:
         base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
         output_dir = os.path.join(base_dir, "experiments")
 
     os.makedirs(output_dir, exist_ok=True)
 
-    card_pool = load_card_pool()
-    deck, deck_name = load_deck_by_id(deck_json_path, deck_id, card_pool)
-    enemies_template, enemygroup_name = load_enemy_group(enemygroup_json_path, enemygroup_id)
+    registry, deck, deck_name, enemygroup_name = _load_setup(deck_json_path, deck_id, enemygroup_json_path, enemygroup_id)
+    if seed is None:
+        seed = _new_run_seed()
 
-    result_log = {
+    header = {
         "deck_id": deck_id,
         "deck_name": deck_name,
         "cards": [card.id for card in deck],
         "enemygroup_id": enemygroup_name,
         "initial_hp": 80,
-        "simulations": []
+        "seed": seed
     }
+    profiler = BattleProfiler() if profile is True else profile or None
+    outcome = {}
+    if target_ci_width is None:
+        simulations = _iter_simulations(deck_json_path, deck_id, enemygroup_json_path, enemygroup_id,
+                                        registry, num_simulations, workers, seed, profiler)
+    else:
+        header.update(max_simulations=num_simulations, target_ci_width=target_ci_width, confidence=confidence,
+                      min_simulations=min_simulations)
+        simulations = _iter_adaptive(deck_json_path, deck_id, enemygroup_json_path, enemygroup_id,
+                                     registry, num_simulations, workers, seed, profiler,
+                                     batch_size, target_ci_width, confidence, min_simulations, outcome)
+    if action_stats is not None:
+        simulations = _feed_stats(simulations, action_stats)
 
-    for _ in range(num_simulations):
-        player = Player(name="Hero", hp=80, energy=3, strategy=RandomStrategy())
-        enemies = [deepcopy(e) for e in enemies_template]
-        battle = Battle(player, enemies, deepcopy(deck), card_pool=card_pool,if_battle_log=False)
+    # an adaptive run only knows how many battles it used once they are written
+    footer = outcome if target_ci_width is not None else None
+    if store is None:
+        filepath = _write_results(output_dir, deck_name, enemygroup_name, header, simulations, output_format, footer)
+    else:
+        from DeckBattleGym.sim.experiment_store import ExperimentStore
+        owns_store = not isinstance(store, ExperimentStore)
+        if owns_store:
+            store = ExperimentStore(store)
+        try:
+            with store.run_writer(deck_id, deck_name, enemygroup_id, enemygroup_name,
+                                  seed=seed, cards=header["cards"]) as store_writer:
+                filepath = _write_results(output_dir, deck_name, enemygroup_name, header,
+                                          _feed_store(simulations, store_writer), output_format, footer)
+        finally:
+            if owns_store:
+                store.close()
 
-        battle.run()
+    if footer is not None:
+        low, high = outcome["ci"]
+        print(f"[Adaptive] {deck_name} vs {enemygroup_name}: used {outcome['num_simulations']} of {num_simulations} "
+              f"battles, win rate {outcome['wins'] / outcome['num_simulations']:.3f} [{low:.3f}, {high:.3f}]")
+    else:
+        outcome["num_simulations"] = num_simulations
+    outcome["filepath"] = filepath
+    print(f"[Done] Saved {outcome['num_simulations']} simulations to {filepath}")
+    if profiler is not None:
+        print(profiler.report())
+    return profiler, outcome
+
+
+def _footer_fields(footer):
+    return {"num_simulations": footer["num_simulations"], "ci": list(footer["ci"])}
 
-        result_log["simulations"].append({
-            "final_hp": player.hp,
-            "turns_taken": battle.turn,
-            "win": player.hp > 0,
-            "turns": battle.simulation_log["turns"]
-        })
-    
-    filename = f"{deck_name}_vs_{enemygroup_name}.json"
-    filepath = os.path.join(output_dir, filename)
 
-    with open(filepath, "w") as f:
-        json.dump(result_log, f, indent=2)
+def _write_results(output_dir, deck_name, enemygroup_name, header, simulations, output_format, footer=None):
+    # footer: a dict that is complete once simulations is exhausted (see _iter_adaptive); its battle
+    # count and interval are added to the header
+    if output_format in ("jsonl", "columnar"):
+        if output_format == "jsonl":
+            filepath = os.path.join(output_dir, f"{deck_name}_vs_{enemygroup_name}.jsonl")
+            # room for the footer fields, so the header line is rewritten in place
+            writer = JsonlResultWriter(filepath, header, header_reserve=0 if footer is None else 96)
+        else:
+            from DeckBattleGym.sim.columnar_log import ColumnarLogWriter
+            filepath = os.path.join(output_dir, f"{deck_name}_vs_{enemygroup_name}.cols")
+            writer = ColumnarLogWriter(filepath, header)
+        with writer:
+            for sim in simulations:
+                writer.write(sim)
+            if footer is not None:
+                writer.update_header(**_footer_fields(footer))
+    elif output_format == "json":
+        simulations = list(simulations)
+        result_log = dict(header, **(_footer_fields(footer) if footer is not None else {}), simulations=simulations)
+        filepath = os.path.join(output_dir, f"{deck_name}_vs_{enemygroup_name}.json")
+        with open(filepath, "w") as f:
+            json.dump(result_log, f, indent=2)
+    else:
+        raise ValueError(f"Unknown output_format: {output_format}")
+    return filepath
 
-    print(f"[Done] Saved {num_simulations} simulations to {filepath}")
+
+def run_paired_simulation(deck_json_path, deck_id_a, deck_id_b,
+                          enemygroup_json_path, enemygroup_id,
+                          num_simulations=100,
+                          workers=1,
+                          seed=None,
+                          target_ci_width=None,
+                          batch_size=100,
+                          confidence=0.95,
+                          min_simulations=100):
+    # both decks replay the same per-battle seeds (common random numbers), so the
+    # difference is estimated from paired outcomes with a much smaller variance.
+    # target_ci_width: stop once the interval on the difference is at most that wide, in batches
+    # of batch_size pairs and after at least min_simulations; num_simulations is then the cap
+    if target_ci_width is not None and batch_size < 1:
+        raise ValueError(f"[Simulation Error] batch_size must be at least 1 for adaptive runs, got {batch_size}.")
+    registry, _, deck_name_a, enemygroup_name = _load_setup(deck_json_path, deck_id_a, enemygroup_json_path, enemygroup_id)
+    _, deck_name_b = registry.deck(deck_id_b)
+    if seed is None:
+        seed = _new_run_seed()
+
+    batch = num_simulations if target_ci_width is None else batch_size
+    workers = max(1, min(workers, batch))
+    wins = {deck_id_a: [], deck_id_b: []}
+    # pairs only deck A / only deck B won
+    played = a_only = b_only = 0
+    with _simulation_pool(deck_json_path, enemygroup_json_path, enemygroup_id, workers) as executor:
+        while played < num_simulations:
+            size = min(batch, num_simulations - played)
+            for deck_id in (deck_id_a, deck_id_b):
+                wins[deck_id] += [1 if sim["win"] else 0 for sim in _iter_range(
+                    executor, registry, deck_id, enemygroup_id, seed, played, size, workers)]
+            for a, b in zip(wins[deck_id_a][played:], wins[deck_id_b][played:]):
+                a_only += a > b
+                b_only += b > a
+            played += size
+            if target_ci_width is not None and can_stop(paired_difference_interval(played, a_only, b_only, confidence),
+                                                        played, target_ci_width, min_simulations):
+                break
+
+    diffs = [a - b for a, b in zip(wins[deck_id_a], wins[deck_id_b])]
+    mean_diff = sum(diffs) / played if played else 0.0
+    if played > 1:
+        variance = sum((d - mean_diff) ** 2 for d in diffs) / (played - 1)
+    else:
+        variance = 0.0
+
+    result = {
+        "deck_a": deck_name_a,
+        "deck_b": deck_name_b,
+        "enemygroup_id": enemygroup_name,
+        "seed": seed,
+        "num_simulations": played,
+        "win_rate_a": sum(wins[deck_id_a]) / played if played else 0.0,
+        "win_rate_b": sum(wins[deck_id_b]) / played if played else 0.0,
+        "difference": mean_diff,
+        "std_error": math.sqrt(variance / played) if played else 0.0,
+        "ci": paired_difference_interval(played, a_only, b_only, confidence)
+    }
+    if target_ci_width is not None:
+        result["max_simulations"] = num_simulations
+        result["min_simulations"] = min_simulations
+    print(f"[Paired] {deck_name_a} {result['win_rate_a']:.3f} vs {deck_name_b} {result['win_rate_b']:.3f} "
+          f"on {enemygroup_name}: diff {mean_diff:+.3f} ± {result['std_error']:.3f} ({played} battles)")
+    return result
+
+
+def run_batch_simulation(deck_json_path, deck_id,
+                         enemygroup_json_path, enemygroup_id,
+                         num_simulations=1000,
+                         seed=None):
+    # summary-only runs: the lockstep numpy engine plays all battles at once when it supports
+    # the matchup, otherwise the reference engine runs them one by one
+    import numpy as np
+    from DeckBattleGym.envs.batch_battle import BatchBattle, unsupported_reason
+
+    registry, deck, deck_name, enemygroup_name = _load_setup(deck_json_path, deck_id, enemygroup_json_path, enemygroup_id)
+    enemies, _ = registry.enemy_group(enemygroup_id)
+    if seed is None:
+        seed = _new_run_seed()
+
+    reason = unsupported_reason(deck, enemies, registry)
+    if reason is None:
+        engine = "batch"
+        outcome = BatchBattle(deck, enemies, num_simulations, registry=registry, seed=seed).run()
+    else:
+        engine = "reference"
+        simulations = list(_iter_battles(registry, deck_id, enemygroup_id, seed, 0, num_simulations))
+        outcome = {
+            "final_hp": np.array([sim["final_hp"] for sim in simulations]),
+            "turns_taken": np.array([sim["turns_taken"] for sim in simulations]),
+            "win": np.array([sim["win"] for sim in simulations], dtype=bool)
+        }
+
+    result = dict(outcome,
+                  deck=deck_name,
+                  enemygroup_id=enemygroup_name,
+                  seed=seed,
+                  num_simulations=num_simulations,
+                  engine=engine,
+                  fallback_reason=reason,
+                  win_rate=float(outcome["win"].mean()) if num_simulations else 0.0,
+                  mean_turns=float(outcome["turns_taken"].mean()) if num_simulations else 0.0,
+                  mean_final_hp=float(outcome["final_hp"].mean()) if num_simulations else 0.0)
+    print(f"[Batch] {deck_name} vs {enemygroup_name} ({engine}): win rate {result['win_rate']:.3f}, "
+          f"{result['mean_turns']:.2f} turns")
+    return result
 
 
 if __name__ == "__main__":
     base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
     deck_json_path = os.path.join(base_dir, "data", "deck.json")
     enemygroup_json_path = os.path.join(base_dir, "data", "enemy_group.json")
-   
+
+    # one matchup at a time; sweep.py runs many decks against many groups with caching
     run_simulation(
         deck_json_path=deck_json_path,
         deck_id="deck06",                             # <-- replace with your own deck_id
         enemygroup_json_path=enemygroup_json_path,
         enemygroup_id="group04",                      # <-- replace with your own enemygroup_id
-        num_simulations=1000
+        num_simulations=1000,
+        workers=1,                                    # <-- number of worker processes
+        output_format="json"                          # <-- "jsonl" streams one battle per line, "columnar" writes a .cols file
     )
-
-
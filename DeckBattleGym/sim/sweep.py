@@ -0,0 +1,279 @@
+import sys
+import os
+import copy
+import json
+import hashlib
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+# -----------------------------------------------
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+# -----------------------------------------------
+
+from DeckBattleGym.envs.loader import get_registry
+from DeckBattleGym.envs.battle import ENGINE_VERSION
+from DeckBattleGym.sim.simulate_battle import _iter_battles, _split_chunks, _CHUNK_SIZE
+from DeckBattleGym.sim.confidence import wilson_interval, can_stop
+
+
+# Deck x enemy group sweeps. Every cell is keyed by a hash of what decides its outcome (the engine
+# version, the deck's cards, the group's enemies, the card/enemy/power data files, the seed and the
+# battle count), and finished cells are kept in a json cache, so rerunning with more decks or groups
+# only plays the new cells. Cells are split into chunks over one worker pool and results are identical to
+# run_simulation with the same seed.
+
+_DATA_FILES = ("card.json", "enemy.json", "power.json")
+METRICS = ("win_rate", "mean_turns", "mean_final_hp", "num_simulations")
+
+# per-process registry for pool workers, see _init_sweep_worker
+_sweep_state = {}
+
+
+def _data_dir():
+    return os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data"))
+
+
+def _content_digest():
+    digest = hashlib.sha256()
+    for name in _DATA_FILES:
+        with open(os.path.join(_data_dir(), name), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def _resolve_decks(registry, decks):
+    # deck ids come from deck.json; a card id list or {"name", "cards"} dict is an inline deck
+    resolved = {}
+    for spec in decks:
+        if isinstance(spec, str):
+            registry.deck(spec)
+            resolved[spec] = registry.decks[spec]
+            continue
+        if isinstance(spec, dict):
+            name, cards = spec["name"], list(spec["cards"])
+        else:
+            cards = list(spec)
+            name = "inline_" + hashlib.sha256(",".join(cards).encode()).hexdigest()[:8]
+        registry.cards(cards)
+        if name in resolved or name in registry.decks:
+            raise ValueError(f"[Sweep Error] Deck name '{name}' is used twice.")
+        resolved[name] = {"name": name, "cards": cards}
+    return resolved
+
+
+def _sweep_registry(deck_json_path, enemygroup_json_path, decks):
+    # the shared registry with the sweep's decks swapped in, templates are not copied
+    registry = copy.copy(get_registry(deck_path=deck_json_path, group_path=enemygroup_json_path))
+    registry.decks = decks
+    return registry
+
+
+def _init_sweep_worker(deck_json_path, enemygroup_json_path, decks):
+    _sweep_state["registry"] = _sweep_registry(deck_json_path, enemygroup_json_path, decks)
+
+
+def _play_chunk(registry, deck_key, group_id, run_seed, start, num_battles):
+    wins = turns = final_hp = 0
+    for sim in _iter_battles(registry, deck_key, group_id, run_seed, start, num_battles):
+        wins += sim["win"]
+        turns += sim["turns_taken"]
+        final_hp += sim["final_hp"]
+    return deck_key, group_id, num_battles, wins, turns, final_hp
+
+
+def _run_sweep_chunk(deck_key, group_id, run_seed, start, num_battles):
+    return _play_chunk(_sweep_state["registry"], deck_key, group_id, run_seed, start, num_battles)
+
+
+def cell_key(content_digest, cards, enemy_ids, seed, num_simulations, adaptive=None):
+    # adaptive: (target_ci_width, batch_size, confidence, min_simulations) when the cell stops early
+    parts = [ENGINE_VERSION, content_digest, list(cards), list(enemy_ids), seed, num_simulations]
+    if adaptive is not None:
+        parts.append(list(adaptive))
+    key = json.dumps(parts)
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def _load_cache(cache_path):
+    if cache_path is None or not os.path.exists(cache_path):
+        return {}
+    with open(cache_path) as f:
+        return json.load(f)
+
+
+def _save_cache(cache_path, cache):
+    tmp_path = cache_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(cache, f, indent=1)
+    os.replace(tmp_path, cache_path)
+
+
+def run_sweep(decks=None,
+              enemygroup_ids=None,
+              num_simulations=200,
+              seed=0,
+              workers=1,
+              deck_json_path=None,
+              enemygroup_json_path=None,
+              cache_path=None,
+              on_cell=None,
+              target_ci_width=None,
+              batch_size=100,
+              confidence=0.95,
+              min_simulations=100):
+    # decks: deck ids and/or inline decks (see _resolve_decks), default every deck in deck.json;
+    # enemygroup_ids default to every group. The seed is fixed by default so reruns hit the cache.
+    # on_cell(deck, group, cell) is called as each cell finishes, cached cells first.
+    # With target_ci_width each cell plays batches of batch_size until its win rate interval is that
+    # narrow and at least min_simulations were played (num_simulations is the cap), and also gets "ci";
+    # num_simulations is what it really used.
+    # Returns {"cells": {deck: {group: {win_rate, mean_turns, mean_final_hp, num_simulations}}}, ...}
+    if target_ci_width is not None and batch_size < 1:
+        raise ValueError(f"[Sweep Error] batch_size must be at least 1 for adaptive sweeps, got {batch_size}.")
+    base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    deck_json_path = deck_json_path or os.path.join(base_dir, "data", "deck.json")
+    enemygroup_json_path = enemygroup_json_path or os.path.join(base_dir, "data", "enemy_group.json")
+    if cache_path is None:
+        cache_path = os.path.join(base_dir, "experiments", "sweep_cache.json")
+    os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+
+    registry = get_registry(deck_path=deck_json_path, group_path=enemygroup_json_path)
+    deck_entries = _resolve_decks(registry, list(registry.decks) if decks is None else decks)
+    if enemygroup_ids is None:
+        enemygroup_ids = list(registry.enemy_groups)
+    for group_id in enemygroup_ids:
+        registry.enemy_group(group_id)
+
+    adaptive = None if target_ci_width is None else (target_ci_width, batch_size, confidence, min_simulations)
+    digest = _content_digest()
+    cache = _load_cache(cache_path)
+    cells = {deck_key: {} for deck_key in deck_entries}
+    pending = {}
+    num_cached = 0
+    for deck_key, entry in deck_entries.items():
+        for group_id in enemygroup_ids:
+            key = cell_key(digest, entry["cards"], registry.enemy_groups[group_id]["enemy_ids"],
+                           seed, num_simulations, adaptive)
+            if key in cache:
+                cells[deck_key][group_id] = cache[key]
+                num_cached += 1
+                if on_cell is not None:
+                    on_cell(deck_key, group_id, cache[key])
+            else:
+                # key, battles played, wins, turns, final hp, chunks still running
+                pending[(deck_key, group_id)] = [key, 0, 0, 0, 0, 0]
+
+    if num_simulations == 0:
+        tasks = []
+    elif adaptive is None:
+        # every chunk of every cell up front
+        chunk_sizes = _split_chunks(num_simulations, -(-num_simulations // _CHUNK_SIZE))
+        chunk_starts = [sum(chunk_sizes[:i]) for i in range(len(chunk_sizes))]
+        tasks = [(deck_key, group_id, seed, start, size)
+                 for deck_key, group_id in pending
+                 for start, size in zip(chunk_starts, chunk_sizes)]
+    else:
+        # a cell's next batch is only scheduled once its previous one is in
+        tasks = [(deck_key, group_id, seed, 0, min(batch_size, num_simulations)) for deck_key, group_id in pending]
+    for deck_key, group_id, _, _, _ in tasks:
+        pending[(deck_key, group_id)][5] += 1
+
+    def finish(deck_key, group_id, played, wins, turns, final_hp):
+        # folds one chunk into its cell, returns the cell's follow-up tasks
+        totals = pending[(deck_key, group_id)]
+        totals[1] += played
+        totals[2] += wins
+        totals[3] += turns
+        totals[4] += final_hp
+        totals[5] -= 1
+        if totals[5]:
+            return []
+        key, played, wins, turns, final_hp, _ = totals
+        ci = None
+        if adaptive is not None:
+            ci = wilson_interval(wins, played, confidence)
+            if played < num_simulations and not can_stop(ci, played, target_ci_width, min_simulations):
+                totals[5] = 1
+                return [(deck_key, group_id, seed, played, min(batch_size, num_simulations - played))]
+        cell = {"win_rate": wins / played, "mean_turns": turns / played,
+                "mean_final_hp": final_hp / played, "num_simulations": played}
+        if ci is not None:
+            cell["ci"] = list(ci)
+        cells[deck_key][group_id] = cache[key] = cell
+        _save_cache(cache_path, cache)
+        if on_cell is not None:
+            on_cell(deck_key, group_id, cell)
+        return []
+
+    if workers <= 1 or len(tasks) <= 1:
+        sweep_registry = _sweep_registry(deck_json_path, enemygroup_json_path, deck_entries)
+        queue = deque(tasks)
+        while queue:
+            queue.extend(finish(*_play_chunk(sweep_registry, *queue.popleft())))
+    else:
+        with ProcessPoolExecutor(max_workers=workers,
+                                 initializer=_init_sweep_worker,
+                                 initargs=(deck_json_path, enemygroup_json_path, deck_entries)) as executor:
+            futures = {executor.submit(_run_sweep_chunk, *task) for task in tasks}
+            while futures:
+                done, futures = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    for task in finish(*future.result()):
+                        futures.add(executor.submit(_run_sweep_chunk, *task))
+
+    return {
+        "seed": seed,
+        "num_simulations": num_simulations,
+        "decks": list(deck_entries),
+        "deck_names": {deck_key: entry["name"] for deck_key, entry in deck_entries.items()},
+        "enemygroups": list(enemygroup_ids),
+        "enemygroup_names": {group_id: registry.enemy_groups[group_id]["name"] for group_id in enemygroup_ids},
+        "cells": cells,
+        "computed": len(pending),
+        "cached": num_cached
+    }
+
+
+def _format_value(value):
+    return str(value) if isinstance(value, int) else f"{value:.2f}"
+
+
+def format_sweep(result, metric="win_rate"):
+    if metric not in METRICS:
+        raise ValueError(f"[Sweep Error] Unknown metric '{metric}', expected one of {METRICS}.")
+    rows = [[""] + [result["enemygroup_names"][g] for g in result["enemygroups"]]]
+    for deck_key in result["decks"]:
+        rows.append([result["deck_names"][deck_key]] +
+                    [_format_value(result["cells"][deck_key][g][metric]) for g in result["enemygroups"]])
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+    return "\n".join("  ".join(cell.rjust(width) if i else cell.ljust(width)
+                               for i, (cell, width) in enumerate(zip(row, widths)))
+                     for row in rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate every deck against every enemy group.")
+    parser.add_argument("--decks", nargs="*", help="deck ids from deck.json (default: all)")
+    parser.add_argument("--cards", action="append", default=[],
+                        help="inline deck as comma separated card ids, may be repeated")
+    parser.add_argument("--groups", nargs="*", help="enemy group ids (default: all)")
+    parser.add_argument("--battles", type=int, default=200, help="battles per cell")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--cache", help="cell cache json (default: experiments/sweep_cache.json)")
+    parser.add_argument("--metric", choices=METRICS, default="win_rate")
+    parser.add_argument("--ci-width", type=float, help="stop each cell once its win rate interval is this narrow, "
+                                                       "--battles is then the cap")
+    parser.add_argument("--batch", type=int, default=100, help="battles per adaptive batch")
+    parser.add_argument("--min-battles", type=int, default=100, help="battles per cell before an adaptive stop")
+    args = parser.parse_args()
+
+    decks = None
+    if args.decks is not None or args.cards:
+        decks = list(args.decks or []) + [cards.split(",") for cards in args.cards]
+    result = run_sweep(decks, args.groups, num_simulations=args.battles, seed=args.seed,
+                       workers=args.workers, cache_path=args.cache,
+                       target_ci_width=args.ci_width, batch_size=args.batch, min_simulations=args.min_battles)
+    print(format_sweep(result, args.metric))
+    print(f"[Done] {result['computed']} cells simulated, {result['cached']} from cache")
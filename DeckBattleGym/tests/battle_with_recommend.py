@@ -10,7 +10,7 @@ from DeckBattleGym.envs.player import Player
 from DeckBattleGym.envs.battle import Battle
 from DeckBattleGym.envs.player_strategy import ManualStrategy
 from DeckBattleGym.envs.loader import load_card_pool, load_deck_by_id, load_enemy_group
-from DeckBattleGym.model.stat_recommendsys import generate_action_stats, recommend_action_ranking
+from DeckBattleGym.model.recommend_index import open_index
 
 
 if __name__ == "__main__":
@@ -18,7 +18,8 @@ if __name__ == "__main__":
     base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
     examine_path = os.path.join(base_dir, "experiments", examine_experiment_json)
     
-    action_stats = generate_action_stats(examine_path, only_wins=True)  # gather the complete stat form 
+    index_path = os.path.splitext(examine_path)[0] + ".index.sqlite"
+    recommend_index = open_index(index_path, [examine_path])             # built once, reused while the experiment is unchanged
 
     deck_path = os.path.join(base_dir, "data", "deck.json")
     enemy_path = os.path.join(base_dir, "data", "enemy_group.json")
@@ -39,6 +40,7 @@ if __name__ == "__main__":
         print(f"\n=== Turn {turn} ===")
         battle.draw_cards(5)
         hand = battle.hand
+        turn_hand = list(hand)                                           # the index is keyed by the hand drawn this turn
 
         while True:
             print(f"\nEnergy:{player.energy}/{player.max_energy}")
@@ -50,7 +52,7 @@ if __name__ == "__main__":
             if player.energy == 0 or not playable:
                 print("End Turn. No playable cards.")
                 break
-            ranking = recommend_action_ranking(playable, turn, action_stats)
+            ranking = recommend_index.recommend_cards(playable, turn, k=10, turn_hand=turn_hand)
 
             hand_ids   = {c.id for c in hand}
             alive_ids  = {e.id for e in battle.enemies if e.hp > 0}